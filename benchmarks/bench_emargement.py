@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de generer_emargement : temps de génération en fonction du nombre
+de jours et d'apprenants, jusqu'à 60 jours × 150 apprenants.
+Le temps par ligne d'émargement doit rester à peu près constant (croissance linéaire).
+
+Usage: python3 benchmarks/bench_emargement.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from generer_emargement import generer_emargement
+from donnees import donnees_synthetiques
+
+
+TAILLES = [(5, 10), (15, 40), (30, 75), (60, 150)]
+
+
+def mesurer(nb_jours, nb_apprenants, dossier):
+    """Retourne (secondes, nombre de lignes d'émargement) pour une taille donnée."""
+    data = donnees_synthetiques(nb_apprenants, nb_jours)
+    output_path = os.path.join(dossier, f"bench_{nb_jours}x{nb_apprenants}.docx")
+    with contextlib.redirect_stdout(io.StringIO()):
+        debut = time.perf_counter()
+        generer_emargement(data, output_path)
+        duree = time.perf_counter() - debut
+    # Par jour : 2 créneaux × (titre + apprenants + titre formateur + 1 formateur)
+    nb_lignes = nb_jours * 2 * (nb_apprenants + 3)
+    return duree, nb_lignes
+
+
+if __name__ == "__main__":
+    print(f"{'jours':>6} {'apprenants':>11} {'lignes':>8} {'temps (s)':>10} {'µs/ligne':>9}")
+    with tempfile.TemporaryDirectory() as dossier:
+        for nb_jours, nb_apprenants in TAILLES:
+            duree, nb_lignes = mesurer(nb_jours, nb_apprenants, dossier)
+            print(f"{nb_jours:>6} {nb_apprenants:>11} {nb_lignes:>8} {duree:>10.3f} {duree / nb_lignes * 1e6:>9.1f}")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark des cinq générateurs sur des formations synthétiques de taille croissante
+(1 → 500 apprenants, 1 → 60 jours de sessions, 1 → 30 modules), avec les vrais
+templates de templates/.
+Pour chaque générateur et chaque taille : temps de génération, pic de mémoire (RSS)
+et taille des documents produits. Chaque mesure tourne dans un processus neuf, avec
+un cache des fragments vide (mémoire et caches de départ identiques) ; le temps
+retenu est le meilleur des essais. Les formations viennent de donnees.py.
+
+Les résultats sont comparés aux références enregistrées (benchmarks/references.json) :
+le script échoue (code 1) si une mesure dépasse sa référence au-delà du seuil.
+Les références dépendent de la machine : les réenregistrer avec --enregistrer
+avant de comparer sur une autre machine. Aucun accès réseau n'est nécessaire.
+
+Usage:
+    python3 benchmarks/bench_generateurs.py                     # comparer aux références
+    python3 benchmarks/bench_generateurs.py --tailles petit,moyen --generateurs emargement
+    python3 benchmarks/bench_generateurs.py --enregistrer       # nouvelles références
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+DOSSIER_SCRIPTS = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(DOSSIER_SCRIPTS))
+from donnees import donnees_synthetiques
+
+
+# Fichier des références (une entrée "generateur/taille" par mesure)
+REFERENCES = Path(__file__).resolve().parent / "references.json"
+
+GENERATEURS = ("certificat", "convocation", "emargement", "convention", "programme")
+
+# Taille -> (apprenants, jours de sessions, modules du programme)
+TAILLES = {
+    "petit": (1, 1, 1),
+    "moyen": (50, 15, 10),
+    "grand": (500, 60, 30),
+}
+
+# Dépassement toléré par rapport à la référence : (relatif, absolu minimum)
+SEUILS = {
+    "secondes": (0.25, 0.05),
+    "rss_mo": (0.15, 5.0),
+    "octets": (0.05, 1024),
+}
+
+
+def executer(generateur, taille, dossier):
+    """
+    Dans le processus de mesure : génère le document et retourne les mesures.
+
+    Returns:
+        {"secondes", "rss_mo", "octets", "fichiers", "phases"}
+    """
+    import cache_fragments
+    from generer_tout import generer_document
+    from mesures import mesurer
+
+    data = donnees_synthetiques(*TAILLES[taille])
+    # Cache des fragments vide, propre à la mesure (le cache sur disque survit aux exécutions)
+    with tempfile.TemporaryDirectory(prefix="bench_fragments_") as cache:
+        cache_fragments.DOSSIER_CACHE = Path(cache)
+        with contextlib.redirect_stdout(io.StringIO()), mesurer(generateur) as mesures:
+            debut = time.perf_counter()
+            fichiers = generer_document(generateur, data, dossier, force=True)
+            duree = time.perf_counter() - debut
+    phases = mesures.releve()["phases"]
+    return {
+        "secondes": round(duree, 4),
+        # ru_maxrss est en kilo-octets sous Linux
+        "rss_mo": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "octets": sum(os.path.getsize(fichier) for fichier in fichiers),
+        "fichiers": len(fichiers),
+        "phases": {nom: detail["secondes"] for nom, detail in phases.items()},
+    }
+
+
+def mesurer_processus(generateur, taille):
+    """Lance une mesure dans un processus neuf, avec un dossier de sortie vide."""
+    with tempfile.TemporaryDirectory(prefix="bench_") as dossier:
+        resultat = subprocess.run(
+            [sys.executable, __file__, "--executer", generateur, taille, dossier],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+    if resultat.returncode != 0:
+        raise RuntimeError(f"{generateur}/{taille} : {resultat.stderr.strip()}")
+    return json.loads(resultat.stdout)
+
+
+def meilleur_essai(generateur, taille, essais):
+    """Meilleur temps (et plus petite mémoire) sur plusieurs essais."""
+    resultats = [mesurer_processus(generateur, taille) for _ in range(essais)]
+    meilleur = min(resultats, key=lambda r: r["secondes"])
+    meilleur["rss_mo"] = min(r["rss_mo"] for r in resultats)
+    return meilleur
+
+
+def regressions(cle, mesure, references):
+    """Liste des mesures qui dépassent leur référence au-delà du seuil."""
+    reference = references.get(cle)
+    if reference is None:
+        return []
+    problemes = []
+    for nom, (relatif, absolu) in SEUILS.items():
+        limite = reference[nom] + max(reference[nom] * relatif, absolu)
+        if mesure[nom] > limite:
+            problemes.append(f"{cle} {nom} : {mesure[nom]} > {limite:.4g} (référence {reference[nom]})")
+    return problemes
+
+
+def charger_references():
+    if not REFERENCES.exists():
+        return {}
+    with open(REFERENCES, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def enregistrer_references(references):
+    with open(REFERENCES, "w", encoding="utf-8") as f:
+        json.dump(references, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des cinq générateurs (temps, mémoire, taille).")
+    parser.add_argument("--generateurs", default=",".join(GENERATEURS),
+                        help=f"Générateurs mesurés, séparés par des virgules (défaut: {','.join(GENERATEURS)})")
+    parser.add_argument("--tailles", default=",".join(TAILLES),
+                        help=f"Tailles mesurées (défaut: {','.join(TAILLES)})")
+    parser.add_argument("--essais", type=int, default=3, help="Essais par mesure, le meilleur est retenu (défaut: 3)")
+    parser.add_argument("--enregistrer", action="store_true",
+                        help="Enregistrer les mesures comme nouvelles références au lieu de comparer")
+    parser.add_argument("--executer", nargs=3, metavar=("GENERATEUR", "TAILLE", "DOSSIER"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executer:
+        # Processus de mesure lancé par mesurer_processus
+        print(json.dumps(executer(*args.executer)))
+        sys.exit(0)
+
+    generateurs = [g.strip() for g in args.generateurs.split(",") if g.strip()]
+    tailles = [t.strip() for t in args.tailles.split(",") if t.strip()]
+    inconnus = [g for g in generateurs if g not in GENERATEURS] + [t for t in tailles if t not in TAILLES]
+    if inconnus:
+        parser.error(f"Inconnu(s) : {', '.join(inconnus)}")
+
+    references = charger_references()
+    problemes = []
+    print(f"{'générateur':<12} {'taille':<6} {'temps (s)':>10} {'réf.':>8} {'RSS (Mo)':>9} {'octets':>10} {'fichiers':>8}")
+    for generateur in generateurs:
+        for taille in tailles:
+            cle = f"{generateur}/{taille}"
+            mesure = meilleur_essai(generateur, taille, args.essais)
+            reference = references.get(cle, {}).get("secondes")
+            print(f"{generateur:<12} {taille:<6} {mesure['secondes']:>10.3f} "
+                  f"{reference if reference is not None else '-':>8} {mesure['rss_mo']:>9.1f} "
+                  f"{mesure['octets']:>10} {mesure['fichiers']:>8}")
+            if args.enregistrer:
+                references[cle] = {nom: mesure[nom] for nom in SEUILS}
+            else:
+                problemes.extend(regressions(cle, mesure, references))
+
+    if args.enregistrer:
+        enregistrer_references(references)
+        print(f"\n💾 Références enregistrées dans {REFERENCES}")
+        sys.exit(0)
+    if problemes:
+        print(f"\n❌ {len(problemes)} régression(s) :")
+        for probleme in problemes:
+            print(f"   - {probleme}")
+        sys.exit(1)
+    print("\n✅ Aucune régression")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Formations synthétiques partagées par les benchmarks (JSON unifié, voir INSTRUCTIONS.md).
+"""
+
+from datetime import datetime, timedelta
+
+
+def donnees_synthetiques(nb_apprenants, nb_jours, nb_modules=0):
+    """
+    Formation complète (JSON unifié) valable pour les cinq documents.
+
+    Args:
+        nb_apprenants: Nombre d'apprenants
+        nb_jours: Jours de formation consécutifs (2 créneaux par jour)
+        nb_modules: Modules du programme détaillé
+    """
+    debut = datetime(2025, 1, 6)
+    jours = [debut + timedelta(days=i) for i in range(nb_jours)]
+    sessions = []
+    for jour in jours:
+        date_str = jour.strftime("%d/%m/%Y")
+        sessions.append({"date": date_str, "type": "E-learning", "debut": "10h00", "fin": "12h00"})
+        sessions.append({"date": date_str, "type": "Visio", "debut": "15h00", "fin": "17h00"})
+    return {
+        "nom_formation": "Benchmark des générateurs",
+        "date_debut": jours[0].strftime("%d/%m/%Y"),
+        "date_fin": jours[-1].strftime("%d/%m/%Y"),
+        "date_emission": debut.strftime("%d/%m/%Y"),
+        "date_signature": jours[-1].strftime("%d/%m/%Y"),
+        "lieu": "Distanciel",
+        "duree_heures": 4 * nb_jours,
+        "duree_jours": nb_jours,
+        "formateurs": ["ALBOUZE Alexis"],
+        "ville_signature": "Paris",
+        "lieu_signature": "Paris",
+        "lien_ressources": "https://example.com/ressources",
+        "beneficiaire": {
+            "nom": "ENTREPRISE BENCH", "siren": "123456789", "siret": "12345678900011",
+            "adresse": "1 RUE EXEMPLE 75001 PARIS", "representant": "Jean DUPONT",
+            "fonction": "Directeur Général",
+        },
+        "objectifs_pedagogiques": [f"Objectif {i + 1}" for i in range(5)],
+        "contenu_pedagogique": [f"Notion {i + 1}" for i in range(10)],
+        "modules": [
+            {
+                "titre": f"Module {i + 1} : Thème {i + 1}",
+                "duree": "3 heures",
+                "objectifs": [f"Objectif {i + 1}.{j + 1}" for j in range(3)],
+                "contenu": [f"Point {i + 1}.{j + 1}" for j in range(5)],
+            }
+            for i in range(nb_modules)
+        ],
+        "apprenants": [
+            {"nom": f"NOM{i}", "prenom": f"Prenom{i}", "email": f"apprenant{i}@example.com",
+             "fonction": "Chef de projet"}
+            for i in range(nb_apprenants)
+        ],
+        "sessions": sessions,
+    }
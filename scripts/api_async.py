@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API asynchrone (asyncio) de génération des documents MINDNESS.
+Le rendu tourne dans un pool borné de processus ; l'appelant n'est jamais
+bloqué, reçoit des événements de progression structurés au lieu des messages
+affichés, peut annuler une génération, et les générations d'un même dossier
+client sont limitées (par défaut une à la fois, ce qui protège aussi son
+manifeste .generation.json).
+
+Usage:
+    async with Generateur(workers=4) as generateur:
+        fichiers = await generateur.generer("certificat", data, on_event=print)
+
+    # Ou avec le générateur partagé du module :
+    fichiers = await generate("certificat", data)
+
+Événements reçus par on_event (dictionnaires) :
+    {"job", "type", "evenement": "debut" | "genere" | "inchange" | "erreur" | "fin" | "annule" | "echec", ...}
+"""
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import defaultdict
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from contextlib import redirect_stdout
+from generer_tout import generer_document
+from parallele import nombre_workers
+from progression import GenerationAnnulee, abonner
+
+
+# Événements finaux d'une génération (le dernier reçu pour un job)
+EVENEMENTS_FINAUX = ("fin", "annule", "echec")
+
+# File des événements et jobs annulés, partagés avec les processus de rendu
+_evenements = None
+_annulations = None
+
+
+def _initialiser(evenements, annulations):
+    """Initialise un processus de rendu avec les objets partagés."""
+    global _evenements, _annulations
+    _evenements = evenements
+    _annulations = annulations
+
+
+def _transmissible(exception):
+    """Vrai si l'exception peut être renvoyée au processus parent (aller-retour pickle)."""
+    try:
+        pickle.loads(pickle.dumps(exception))
+        return True
+    except Exception:
+        return False
+
+
+def _executer(job, type_doc, data, dossier, force):
+    """Exécuté dans un processus de rendu : génère et transmet la progression."""
+    def verifier_annulation():
+        if job in _annulations:
+            raise GenerationAnnulee(f"Génération {job} annulée")
+
+    def transmettre(evenement):
+        verifier_annulation()
+        _evenements.put({"job": job, "type": type_doc, **evenement})
+
+    final = {"evenement": "fin"}
+    try:
+        transmettre({"evenement": "debut"})
+        with abonner(transmettre, verifier_annulation), open(os.devnull, "w") as muet, redirect_stdout(muet):
+            fichiers = generer_document(type_doc, data, dossier, force)
+        final["fichiers"] = fichiers
+        return fichiers
+    except GenerationAnnulee:
+        final = {"evenement": "annule"}
+        raise
+    except Exception as e:
+        final = {"evenement": "echec", "erreur": str(e)}
+        if not _transmissible(e):
+            # Une exception que le parent ne saurait pas relire casserait tout le pool
+            raise RuntimeError(f"{type(e).__name__}: {e}") from None
+        raise
+    finally:
+        _annulations.pop(job, None)
+        _evenements.put({"job": job, "type": type_doc, **final})
+
+
+class Generateur:
+    """Pool de rendu partagé par les générations lancées depuis une boucle asyncio."""
+
+    def __init__(self, workers=0, par_client=1):
+        """
+        Args:
+            workers: Nombre de processus de rendu (0 = un par cœur)
+            par_client: Générations simultanées autorisées par dossier client
+        """
+        self.workers = nombre_workers(workers)
+        self.par_client = par_client
+        self._executor = None
+        self._compteur = itertools.count(1)
+        self._jobs = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.fermer()
+
+    def _demarrer(self):
+        self._boucle = asyncio.get_running_loop()
+        self._limites = defaultdict(lambda: asyncio.Semaphore(self.par_client))
+        self._gestionnaire = multiprocessing.Manager()
+        self._evenements = self._gestionnaire.Queue()
+        self._annulations = self._gestionnaire.dict()
+        self._executor = ProcessPoolExecutor(
+            self.workers, initializer=_initialiser, initargs=(self._evenements, self._annulations)
+        )
+        self._lecteur = threading.Thread(target=self._lire_evenements, daemon=True)
+        self._lecteur.start()
+
+    def _lire_evenements(self):
+        """Thread de lecture : relaie les événements des processus vers la boucle asyncio."""
+        while True:
+            try:
+                evenement = self._evenements.get()
+            except (EOFError, OSError):
+                # Gestionnaire arrêté (fin du programme sans fermer())
+                return
+            if evenement is None:
+                return
+            self._boucle.call_soon_threadsafe(self._distribuer, evenement)
+
+    def _distribuer(self, evenement):
+        on_event, termine = self._jobs.get(evenement["job"], (None, None))
+        if on_event is not None:
+            on_event(evenement)
+        if termine is not None and evenement["evenement"] in EVENEMENTS_FINAUX:
+            del self._jobs[evenement["job"]]
+            termine.set()
+
+    async def generer(self, type_doc, data, on_event=None, dossier=None, force=False):
+        """
+        Génère un type de document sans bloquer la boucle asyncio.
+
+        Args:
+            type_doc: programme, convention, convocation, emargement ou certificat
+            data: JSON de la formation (dictionnaire)
+            on_event: Fonction appelée (dans la boucle) avec chaque événement de progression
+            dossier: Dossier de sortie (défaut: _source_dir du JSON, sinon dossier courant)
+            force: Régénérer même si les entrées n'ont pas changé
+
+        Returns:
+            Liste des chemins générés (ou inchangés)
+        """
+        if self._executor is None:
+            self._demarrer()
+        client = os.path.abspath(dossier or data.get("_source_dir") or "")
+        job = next(self._compteur)
+
+        async with self._limites[client]:
+            termine = asyncio.Event()
+            self._jobs[job] = (on_event, termine)
+            future = self._executor.submit(_executer, job, type_doc, data, dossier, force)
+            try:
+                fichiers = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                if future.cancel():
+                    # Jamais démarrée : aucun événement ne viendra
+                    self._jobs.pop(job, None)
+                else:
+                    # En cours : le processus s'arrête au prochain document. La place du client
+                    # reste prise jusque-là : aucune autre génération ne doit écrire dans le même
+                    # dossier (documents, manifeste) en même temps
+                    self._annulations[job] = True
+                    arret = asyncio.ensure_future(self._attendre_arret(future, termine))
+                    while not arret.done():
+                        try:
+                            await asyncio.shield(arret)
+                        except asyncio.CancelledError:
+                            # Nouvelle annulation de l'appelant : l'attente continue
+                            pass
+                raise
+            # Attendre que tous les événements de la génération aient été distribués
+            await termine.wait()
+            return fichiers
+
+    async def _attendre_arret(self, future, termine):
+        """Attend l'arrêt effectif d'une génération en cours : fin du processus, puis son dernier événement."""
+        try:
+            await asyncio.wrap_future(future)
+        except BrokenExecutor:
+            # Processus de rendu perdu : aucun événement ne viendra
+            return
+        except Exception:
+            pass
+        await termine.wait()
+
+    async def fermer(self):
+        """Attend la fin des générations en cours et arrête le pool."""
+        if self._executor is None:
+            return
+        await self._boucle.run_in_executor(None, self._arreter)
+        self._executor = None
+
+    def _arreter(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._evenements.put(None)
+        self._lecteur.join()
+        self._gestionnaire.shutdown()
+
+
+# Générateur partagé par les appels à generate()
+_generateur = None
+
+
+async def generate(type_doc, data, **options):
+    """Génère un document avec le générateur partagé du module (voir Generateur.generer)."""
+    global _generateur
+    if _generateur is None:
+        _generateur = Generateur()
+    return await _generateur.generer(type_doc, data, **options)
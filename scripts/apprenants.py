@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lecture paresseuse des listes d'apprenants (export CSV ou fichier JSONL).
+Les apprenants sont produits un par un, au fil de la lecture du fichier :
+la génération commence dès la première ligne et la mémoire ne dépend pas
+de la taille de la liste.
+
+Colonnes reconnues (insensibles à la casse et aux accents) :
+nom, prenom / prénom, email / e-mail / mail, fonction.
+Chaque ligne est vérifiée à la lecture selon la règle des apprenants du
+document (schema.SCHEMAS) : une ligne invalide (ou JSON/CSV illisible) lève
+SchemaInvalide avec son numéro.
+"""
+
+import csv
+import json
+import os
+import unicodedata
+from schema import SchemaInvalide, verifier_apprenant
+
+
+# En-tête normalisé -> clé utilisée par les générateurs
+COLONNES = {
+    "nom": "nom",
+    "prenom": "prenom",
+    "email": "email",
+    "mail": "email",
+    "courriel": "email",
+    "fonction": "fonction",
+}
+
+
+def _normaliser_colonne(colonne):
+    """'Prénom ' -> 'prenom', 'E-mail' -> 'email'."""
+    sans_accents = unicodedata.normalize("NFKD", colonne or "").encode("ascii", "ignore").decode("ascii")
+    cle = "".join(c for c in sans_accents.lower() if c.isalnum())
+    return COLONNES.get(cle, cle)
+
+
+def _lire_csv(f, invalide):
+    debut = f.read(4096)
+    f.seek(0)
+    try:
+        dialecte = csv.Sniffer().sniff(debut, delimiters=",;\t")
+    except csv.Error:
+        dialecte = csv.excel
+    lecteur = csv.reader(f, dialecte)
+    try:
+        colonnes = [_normaliser_colonne(colonne) for colonne in next(lecteur, [])]
+        for ligne in lecteur:
+            if not any(valeur.strip() for valeur in ligne):
+                continue
+            yield lecteur.line_num, {colonne: valeur.strip() for colonne, valeur in zip(colonnes, ligne)}
+    except csv.Error as e:
+        raise invalide(lecteur.line_num, f"CSV invalide ({e})")
+
+
+def _lire_jsonl(f, invalide):
+    for numero, ligne in enumerate(f, 1):
+        if not ligne.strip():
+            continue
+        try:
+            yield numero, json.loads(ligne)
+        except ValueError as e:
+            raise invalide(numero, f"JSON invalide ({e})")
+
+
+def _produire(f, lire, nom_fichier, type_doc):
+    """Apprenants du fichier déjà ouvert `f`, vérifiés ligne par ligne ; ferme le fichier à la fin."""
+    def invalide(numero, message):
+        return SchemaInvalide(type_doc or "apprenants", [f"{nom_fichier}[ligne {numero}] : {message}"])
+
+    with f:
+        for numero, apprenant in lire(f, invalide):
+            if type_doc is not None:
+                erreurs = verifier_apprenant(type_doc, apprenant, f"{nom_fichier}[ligne {numero}]")
+                if erreurs:
+                    raise SchemaInvalide(type_doc, erreurs)
+            yield apprenant
+
+
+def lire_apprenants(path, type_doc=None):
+    """
+    Apprenants d'un fichier CSV (séparateur , ; ou tabulation) ou JSONL, produits un par un.
+    Le fichier est ouvert tout de suite : un fichier absent est signalé avant la génération.
+
+    Args:
+        path: Chemin du fichier (.csv, .jsonl ou .ndjson)
+        type_doc: Document généré : chaque ligne est vérifiée selon sa règle des apprenants
+
+    Returns:
+        Itérateur de dictionnaires {"nom", "prenom", "email", ...}
+
+    Raises:
+        OSError: si le fichier est absent ou illisible
+        SchemaInvalide: pendant la lecture, à la première ligne invalide (numéro de ligne dans l'erreur)
+    """
+    lire = _lire_jsonl if path.lower().endswith((".jsonl", ".ndjson")) else _lire_csv
+    f = open(path, "r", encoding="utf-8-sig", newline="")
+    return _produire(f, lire, os.path.basename(path), type_doc)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache des fragments rendus (runs OOXML), partagé entre les exécutions.
+Un fragment est un groupe de segments mis en forme (ex: un module du programme
+détaillé) : ses runs ne dépendent que des segments et de la mise en forme (rPr)
+du run qui contenait le placeholder. Ils sont rendus une seule fois, enregistrés
+sur disque sous l'empreinte de ce contenu, puis simplement recopiés : un module
+du catalogue repris par plusieurs formations n'est rendu qu'une fois.
+
+Le dossier du cache (.cache/fragments/, ou celui de la variable d'environnement
+MINDNESS_CACHE_FRAGMENTS) peut être supprimé à tout moment : les fragments sont
+rendus à nouveau au besoin. purger_cache() supprime ceux qui n'ont pas servi
+depuis JOURS_CONSERVATION jours (appelée chaque jour par serveur.py).
+
+Usage:
+    valeur = [Fragment([gras("Module 1"), " (3 heures)"]), Fragment([...])]
+    index.remplir(doc, {"{{PROGRAMME_DETAILLE}}": valeur})
+"""
+
+import os
+import tempfile
+import time
+from collections import namedtuple
+from copy import deepcopy
+from pathlib import Path
+from commun import OxmlElement, parse_xml
+from incremental import empreinte
+from mesures import compter
+
+
+# Dossier des fragments rendus (défaut: à côté du dossier scripts/)
+DOSSIER_CACHE = Path(
+    os.environ.get("MINDNESS_CACHE_FRAGMENTS") or Path(__file__).parent.parent / ".cache" / "fragments"
+)
+
+# Fragments inutilisés depuis ce nombre de jours : supprimés par purger_cache()
+JOURS_CONSERVATION = 30
+
+# Version du rendu des segments : à incrémenter quand inserer_segments change
+VERSION_RENDU = 1
+
+# Fragments déjà lus ou rendus dans ce processus : empreinte -> w:p contenant les runs
+_fragments = {}
+
+
+def _lire(chemin):
+    """w:p enregistré dans le cache, ou None s'il est absent ou illisible."""
+    try:
+        with open(chemin, "rb") as f:
+            conteneur = parse_xml(f.read())
+        # Date de dernière utilisation, pour purger_cache()
+        os.utime(chemin)
+        return conteneur
+    except (OSError, SyntaxError):
+        return None
+
+
+def _ecrire(chemin, conteneur):
+    """Enregistre le fragment (fichier provisoire puis renommage : sûr entre processus)."""
+    from lxml import etree
+    try:
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        fd, provisoire = tempfile.mkstemp(dir=chemin.parent, suffix=".partiel")
+        with os.fdopen(fd, "wb") as f:
+            f.write(etree.tostring(conteneur, encoding="utf-8"))
+        os.replace(provisoire, chemin)
+    except OSError:
+        # Cache en lecture seule ou plein : le fragment reste en mémoire
+        pass
+
+
+class Fragment(namedtuple("Fragment", "segments")):
+    """
+    Groupe de segments (textes ou Segment) rendu une fois par mise en forme d'origine.
+    Sérialisable en JSON comme la liste de ses segments (empreintes de génération).
+    """
+
+    __slots__ = ()
+
+    def runs(self, rpr, rendre):
+        """
+        Copies des runs du fragment pour la mise en forme `rpr`.
+
+        Args:
+            rpr: rPr du run qui contenait le placeholder (ou None)
+            rendre: Fonction (rpr, segment) -> w:r, appelée si le fragment n'est pas en cache
+        """
+        from lxml import etree
+        cle = empreinte(
+            VERSION_RENDU,
+            etree.tostring(rpr, encoding="unicode") if rpr is not None else None,
+            self.segments,
+        )
+        conteneur = _fragments.get(cle)
+        if conteneur is None:
+            chemin = DOSSIER_CACHE / cle[:2] / f"{cle}.xml"
+            conteneur = _lire(chemin)
+            if conteneur is None:
+                conteneur = OxmlElement("w:p")
+                conteneur.extend(rendre(rpr, segment) for segment in self.segments)
+                _ecrire(chemin, conteneur)
+                compter("fragments_rendus")
+            _fragments[cle] = conteneur
+        compter("fragments")
+        return [deepcopy(r) for r in conteneur]
+
+
+def vider_cache():
+    """Oublie les fragments gardés en mémoire (le cache sur disque est conservé)."""
+    _fragments.clear()
+
+
+def purger_cache(jours=JOURS_CONSERVATION):
+    """
+    Supprime du disque les fragments inutilisés depuis `jours` jours
+    (et les fichiers provisoires abandonnés). 0 = tout le cache.
+
+    Returns:
+        Nombre de fichiers supprimés
+    """
+    limite = time.time() - jours * 86400
+    supprimes = 0
+    for chemin in DOSSIER_CACHE.glob("*/*"):
+        try:
+            if chemin.stat().st_mtime <= limite:
+                chemin.unlink()
+                supprimes += 1
+        except OSError:
+            # Supprimé entre-temps par un autre processus
+            pass
+    return supprimes
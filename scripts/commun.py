@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Socle commun des générateurs : noms de python-docx importés à la demande,
+recherche des templates, lecture du JSON et options partagées par les scripts.
+python-docx (et lxml) ne sont importés qu'au premier document rendu : un
+--help ou une simple vérification du JSON (--verifier) n'en paie pas le coût.
+"""
+
+import importlib
+import json
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+from conversion_pdf import ConvertisseurPDF
+from schema import SchemaInvalide, valider
+
+
+# Dossier des templates Word (à côté du dossier scripts/)
+DOSSIER_TEMPLATES = Path(__file__).parent.parent / "templates"
+
+
+class _NomDocx:
+    """Classe, fonction ou constante de python-docx, importée au premier usage."""
+
+    __slots__ = ("_module", "_nom", "_objet")
+
+    def __init__(self, module, nom):
+        self._module = module
+        self._nom = nom
+        self._objet = None
+
+    def _charger(self):
+        if self._objet is None:
+            self._objet = getattr(importlib.import_module(self._module), self._nom)
+        return self._objet
+
+    def __call__(self, *args, **kwargs):
+        return self._charger()(*args, **kwargs)
+
+    def __getattr__(self, attribut):
+        return getattr(self._charger(), attribut)
+
+
+Document = _NomDocx("docx", "Document")
+_Body = _NomDocx("docx.document", "_Body")
+_Cell = _NomDocx("docx.table", "_Cell")
+Table = _NomDocx("docx.table", "Table")
+Paragraph = _NomDocx("docx.text.paragraph", "Paragraph")
+Run = _NomDocx("docx.text.run", "Run")
+OxmlElement = _NomDocx("docx.oxml", "OxmlElement")
+parse_xml = _NomDocx("docx.oxml", "parse_xml")
+nsdecls = _NomDocx("docx.oxml.ns", "nsdecls")
+Pt = _NomDocx("docx.shared", "Pt")
+Cm = _NomDocx("docx.shared", "Cm")
+WD_ALIGN_PARAGRAPH = _NomDocx("docx.enum.text", "WD_ALIGN_PARAGRAPH")
+RT = _NomDocx("docx.opc.constants", "RELATIONSHIP_TYPE")
+
+
+@lru_cache(maxsize=None)
+def qn(tag):
+    """Nom qualifié d'une balise ('w:p' -> '{http://...}p'), mémorisé."""
+    from docx.oxml.ns import qn as qn_docx
+    return qn_docx(tag)
+
+
+def trouver_template(template_path):
+    """
+    Chemin du template : tel quel s'il existe, sinon dans le dossier templates/.
+
+    Raises:
+        FileNotFoundError: si le template est introuvable
+    """
+    template = Path(template_path)
+    if not template.exists():
+        template = DOSSIER_TEMPLATES / template_path
+        if not template.exists():
+            raise FileNotFoundError(f"Template non trouvé: {template_path}")
+    return str(template)
+
+
+def dossier_client(json_path):
+    """Dossier client d'un JSON : remonte d'un niveau si le JSON est dans data/."""
+    source_dir = os.path.dirname(os.path.abspath(json_path))
+    if os.path.basename(source_dir) == "data":
+        source_dir = os.path.dirname(source_dir)
+    return source_dir
+
+
+def charger_json(json_path):
+    """
+    Lit le JSON d'une formation pour un script : les documents seront générés
+    dans le dossier client (sauf s'il s'agit du dossier courant).
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    source_dir = dossier_client(json_path)
+    if source_dir and source_dir != os.getcwd():
+        data["_source_dir"] = source_dir
+    return data
+
+
+def verifier_ou_quitter(data, type_doc, seulement=False):
+    """
+    Pour les scripts : vérifie le JSON, affiche toutes les erreurs et quitte s'il est invalide.
+
+    Args:
+        seulement: Quitter aussi quand le JSON est valide (option --verifier)
+    """
+    try:
+        valider(data, type_doc)
+    except SchemaInvalide as e:
+        quitter_invalide(e)
+    if seulement:
+        print(f"✅ Données valides pour {type_doc}")
+        sys.exit(0)
+
+
+def quitter_invalide(e):
+    """Pour les scripts : affiche toutes les erreurs d'un SchemaInvalide et quitte."""
+    print(f"❌ Données invalides pour {e.type_doc} :")
+    for erreur in e.erreurs:
+        print(f"   - {erreur}")
+    sys.exit(1)
+
+
+def options_profil(parser):
+    """Ajoute --profile et --profile-jsonl (mesures de chaque phase) à un script."""
+    parser.add_argument("--profile", action="store_true",
+                        help="Mesurer la durée de chaque phase (résumé sur stderr)")
+    parser.add_argument("--profile-jsonl", metavar="FICHIER",
+                        help="Ajouter aussi les mesures, en une ligne JSON, à FICHIER (implique --profile)")
+
+
+def options_communes(parser, documents="le document", verifier=True):
+    """
+    Ajoute les options partagées par les scripts de génération :
+    --pdf, --verifier, --force, --profile et --profile-jsonl.
+
+    Args:
+        documents: Documents produits, pour l'aide (ex: "les certificats")
+        verifier: Ajouter --verifier (vérification du JSON seule)
+    """
+    parser.add_argument("--pdf", action="store_true",
+                        help=f"Convertir aussi {documents} en PDF (LibreOffice)")
+    if verifier:
+        parser.add_argument("--verifier", action="store_true",
+                            help="Vérifier le JSON (toutes les erreurs) sans générer")
+    parser.add_argument("--force", action="store_true",
+                        help=f"Régénérer même {documents} dont les entrées n'ont pas changé")
+    options_profil(parser)
+
+
+def convertisseur_ou_quitter(parser, args):
+    """
+    Pour les scripts : convertisseur PDF si --pdf est demandé, sinon None.
+    LibreOffice absent est une erreur d'usage (message et code 2, comme generer_tout.py).
+    """
+    if not args.pdf:
+        return None
+    try:
+        return ConvertisseurPDF()
+    except RuntimeError as e:
+        parser.error(str(e))
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conversion des documents générés en PDF avec LibreOffice en mode headless.
+Un convertisseur garde ses processus LibreOffice ouverts pendant toute la
+génération : les DOCX lui sont soumis au fur et à mesure et convertis par lots,
+en parallèle de la génération des documents suivants.
+
+Chaque worker démarre un seul LibreOffice, sur un port libre, et lui envoie
+tous ses lots :
+- avec unoconv : listener unoconv (unoconv --listener) ;
+- sinon, si le module uno de LibreOffice est importable : soffice --accept,
+  piloté directement par UNO (un document chargé puis exporté à la fois).
+Sans l'un ni l'autre, chaque lot est converti par un appel à soffice --convert-to
+(un démarrage de LibreOffice par lot, avec un profil propre au worker, créé une
+fois) : le worker attend alors brièvement d'autres DOCX pour remplir ses lots.
+"""
+
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from mesures import compter, phase
+
+
+# Délai laissé à un listener (unoconv ou soffice) pour démarrer LibreOffice
+DELAI_LISTENER = 3
+
+# Sans listener : attente d'autres DOCX avant de lancer un lot incomplet
+DELAI_LOT = 1
+
+
+def _port_libre():
+    """Port TCP libre sur la machine, attribué par le système (deux exécutions ne se gênent pas)."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _module_uno():
+    """Module uno de LibreOffice (pilotage d'un soffice --accept), ou None s'il n'est pas installé."""
+    try:
+        import uno
+    except ImportError:
+        return None
+    return uno
+
+
+def trouver_libreoffice():
+    """Chemin de l'exécutable LibreOffice (soffice ou libreoffice), ou None."""
+    for nom in ("soffice", "libreoffice"):
+        chemin = shutil.which(nom)
+        if chemin:
+            return chemin
+    return None
+
+
+def chemin_pdf(docx_path):
+    """Chemin du PDF correspondant à un DOCX (même dossier, même nom)."""
+    return os.path.splitext(docx_path)[0] + ".pdf"
+
+
+def pdf_a_jour(docx_path):
+    """Vrai si le PDF existe et est plus récent que le DOCX."""
+    pdf_path = chemin_pdf(docx_path)
+    return os.path.exists(pdf_path) and os.path.getmtime(pdf_path) >= os.path.getmtime(docx_path)
+
+
+class ConvertisseurPDF:
+    """
+    Pool de workers LibreOffice qui convertit en PDF les DOCX qu'on lui soumet.
+
+    Usage :
+        with ConvertisseurPDF() as convertisseur:
+            generer_certificat(data, convertisseur=convertisseur)
+    """
+
+    def __init__(self, workers=1, taille_lot=20):
+        self.soffice = trouver_libreoffice()
+        if self.soffice is None:
+            raise RuntimeError("LibreOffice introuvable (soffice) : impossible de générer les PDF")
+        self.unoconv = shutil.which("unoconv")
+        self.taille_lot = taille_lot
+        self.pdfs = []
+        self.erreurs = []
+        self._file = queue.Queue()
+        self._verrou = threading.Lock()
+        self._profils = tempfile.TemporaryDirectory(prefix="mindness_lo_")
+        self._listeners = []
+        self._threads = []
+        for i in range(max(workers, 1)):
+            thread = threading.Thread(target=self._travailler, args=(i,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.terminer()
+
+    def soumettre(self, docx_path):
+        """Ajoute un DOCX à convertir (sans attendre). Ignoré si le PDF est déjà à jour."""
+        if pdf_a_jour(docx_path):
+            return
+        self._file.put(os.path.abspath(docx_path))
+
+    def terminer(self):
+        """
+        Attend la fin des conversions en cours et arrête les processus LibreOffice.
+
+        Returns:
+            (PDF générés, liste des (DOCX, erreur))
+        """
+        if not self._threads:
+            return self.pdfs, self.erreurs
+        for _ in self._threads:
+            self._file.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for listener in self._listeners:
+            listener.terminate()
+            listener.wait()
+        self._profils.cleanup()
+
+        print(f"\n📄 {len(self.pdfs)} PDF généré(s)")
+        if self.erreurs:
+            print(f"⚠️  {len(self.erreurs)} PDF en erreur")
+        return self.pdfs, self.erreurs
+
+    def _travailler(self, numero):
+        """Boucle d'un worker : regroupe les DOCX en attente en lots et les convertit."""
+        convertir, attente = self._demarrer(numero)
+        fin = False
+        while not fin:
+            docx_path = self._file.get()
+            if docx_path is None:
+                return
+            lot = [docx_path]
+            # Regrouper ce qui est en attente, dans la limite d'un lot
+            while len(lot) < self.taille_lot:
+                try:
+                    docx_path = self._file.get(timeout=attente) if attente else self._file.get_nowait()
+                except queue.Empty:
+                    break
+                if docx_path is None:
+                    fin = True
+                    break
+                lot.append(docx_path)
+            self._convertir_lot(convertir, lot)
+
+    def _lancer_listener(self, commande):
+        """Démarre un processus LibreOffice qui reste ouvert jusqu'à terminer()."""
+        listener = subprocess.Popen(commande, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with self._verrou:
+            self._listeners.append(listener)
+        return listener
+
+    def _demarrer(self, numero):
+        """
+        Prépare le worker.
+
+        Returns:
+            (convertir(dossier, fichiers) -> message d'erreur, attente avant un lot incomplet)
+        """
+        profil = Path(self._profils.name) / f"worker{numero}"
+        port = str(_port_libre())
+
+        if self.unoconv:
+            self._lancer_listener([self.unoconv, "--listener", "--port", port])
+            time.sleep(DELAI_LISTENER)
+            return self._commande([self.unoconv, "--port", port, "-f", "pdf", "-o"]), 0
+
+        uno = _module_uno()
+        if uno is not None:
+            self._lancer_listener([
+                self.soffice, f"-env:UserInstallation={profil.as_uri()}", "--headless", "--norestore",
+                "--invisible", f"--accept=socket,host=127.0.0.1,port={port};urp;"
+            ])
+            return self._convertisseur_uno(uno, port), 0
+
+        return self._commande([
+            self.soffice, f"-env:UserInstallation={profil.as_uri()}",
+            "--headless", "--norestore", "--convert-to", "pdf", "--outdir"
+        ]), DELAI_LOT
+
+    @staticmethod
+    def _commande(commande):
+        """Conversion d'un lot par un appel à `commande` (suivie du dossier de sortie et des fichiers)."""
+        def convertir(dossier, fichiers):
+            try:
+                resultat = subprocess.run(
+                    commande + [dossier + os.sep] + fichiers,
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+                )
+            except OSError as e:
+                return str(e)
+            return resultat.stderr.strip() or f"code retour {resultat.returncode}"
+        return convertir
+
+    @staticmethod
+    def _convertisseur_uno(uno, port):
+        """Conversion d'un lot par UNO, sur le soffice --accept du worker (connexion gardée)."""
+        from com.sun.star.beans import PropertyValue
+
+        def propriete(nom, valeur):
+            valeur_uno = PropertyValue()
+            valeur_uno.Name = nom
+            valeur_uno.Value = valeur
+            return valeur_uno
+
+        bureau = []
+
+        def connecter():
+            local = uno.getComponentContext()
+            resolveur = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+            limite = time.time() + DELAI_LISTENER * 10
+            while True:
+                try:
+                    contexte = resolveur.resolve(
+                        f"uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext"
+                    )
+                    return contexte.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", contexte)
+                except Exception:
+                    # LibreOffice encore en cours de démarrage
+                    if time.time() > limite:
+                        raise
+                    time.sleep(0.2)
+
+        def convertir(dossier, fichiers):
+            message = "conversion impossible"
+            try:
+                if not bureau:
+                    bureau.append(connecter())
+            except Exception as e:
+                return f"LibreOffice injoignable sur le port {port} : {e}"
+            for docx_path in fichiers:
+                try:
+                    document = bureau[0].loadComponentFromURL(
+                        uno.systemPathToFileUrl(docx_path), "_blank", 0, (propriete("Hidden", True),)
+                    )
+                    try:
+                        document.storeToURL(
+                            uno.systemPathToFileUrl(chemin_pdf(docx_path)),
+                            (propriete("FilterName", "writer_pdf_Export"),)
+                        )
+                    finally:
+                        document.close(True)
+                except Exception as e:
+                    message = str(e) or type(e).__name__
+            return message
+        return convertir
+
+    def _convertir_lot(self, convertir, lot):
+        """Convertit un lot de DOCX, en un appel par dossier de sortie."""
+        par_dossier = {}
+        for docx_path in lot:
+            par_dossier.setdefault(os.path.dirname(docx_path), []).append(docx_path)
+
+        for dossier, fichiers in par_dossier.items():
+            debut = time.time()
+            with phase("pdf"):
+                message = convertir(dossier, fichiers)
+
+            for docx_path in fichiers:
+                pdf_path = chemin_pdf(docx_path)
+                with self._verrou:
+                    if os.path.exists(pdf_path) and os.path.getmtime(pdf_path) >= debut - 1:
+                        self.pdfs.append(pdf_path)
+                        compter("pdf")
+                        print(f"   📄 {os.path.basename(pdf_path)}")
+                    else:
+                        self.erreurs.append((docx_path, message))
+                        print(f"   ❌ PDF {os.path.basename(docx_path)} : {message}")
+
+
+def decouper_pdf(pdf_path, pdfs_sortie):
+    """
+    Découpe un PDF groupé (ex: certificats, une section par apprenant) en un PDF par section.
+    Chaque section doit avoir le même nombre de pages. Nécessite pypdf (pip install pypdf).
+
+    Args:
+        pdf_path: PDF à découper
+        pdfs_sortie: Chemins des PDF à écrire, un par section, dans l'ordre
+
+    Returns:
+        Liste des PDF écrits
+    """
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:
+        raise RuntimeError("pypdf est nécessaire pour découper les PDF : pip install pypdf")
+
+    pages = PdfReader(pdf_path).pages
+    if not pdfs_sortie or len(pages) % len(pdfs_sortie):
+        raise ValueError(f"{len(pages)} page(s) ne se répartissent pas en {len(pdfs_sortie)} document(s)")
+    pages_par_document = len(pages) // len(pdfs_sortie)
+
+    for i, sortie in enumerate(pdfs_sortie):
+        writer = PdfWriter()
+        for page in pages[i * pages_par_document:(i + 1) * pages_par_document]:
+            writer.add_page(page)
+        with open(sortie, "wb") as f:
+            writer.write(f)
+        print(f"   📄 {os.path.basename(sortie)}")
+    return list(pdfs_sortie)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dates des formations : lecture des dates du JSON et formatage en français,
+partagés par tous les générateurs.
+Les mêmes quelques dates reviennent pour chaque apprenant et chaque session :
+lectures et formatages sont mémorisés, et le format reconnu en dernier est
+essayé en premier (un JSON utilise en pratique un seul format).
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+
+# Formats de date acceptés dans le JSON
+FORMATS_DATE = ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%y")
+
+MOIS = (
+    "", "janvier", "février", "mars", "avril", "mai", "juin",
+    "juillet", "août", "septembre", "octobre", "novembre", "décembre"
+)
+JOURS = ("lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche")
+
+# Format qui a reconnu la dernière date lue
+_format_reconnu = FORMATS_DATE[0]
+
+
+@lru_cache(maxsize=1024)
+def parse_date(date_str):
+    """Parse une date en différents formats (résultat mémorisé par texte)."""
+    global _format_reconnu
+    try:
+        return datetime.strptime(date_str, _format_reconnu)
+    except ValueError:
+        pass
+    for fmt in FORMATS_DATE:
+        if fmt == _format_reconnu:
+            continue
+        try:
+            date = datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+        _format_reconnu = fmt
+        return date
+    raise ValueError(f"Format de date non reconnu: {date_str}")
+
+
+@lru_cache(maxsize=1024)
+def format_date_fr(date_obj):
+    """Formate une date en français (ex: 16 décembre 2024)."""
+    return f"{date_obj.day} {MOIS[date_obj.month]} {date_obj.year}"
+
+
+@lru_cache(maxsize=1024)
+def format_date_jour(date_obj):
+    """Formate une date en français avec le jour (ex: lundi 16 décembre 2024)."""
+    return f"{JOURS[date_obj.weekday()]} {date_obj.day} {MOIS[date_obj.month]} {date_obj.year}"
+
+
+@lru_cache(maxsize=1024)
+def format_date_short(date_obj):
+    """Formate une date en format court (ex: 16/12/2024)."""
+    return f"{date_obj.day:02d}/{date_obj.month:02d}/{date_obj.year:04d}"
+
+
+def jours_ouvres(date_debut, date_fin):
+    """Liste des jours ouvrés (lundi-vendredi) entre deux dates incluses."""
+    dates = []
+    current = date_debut
+    while current <= date_fin:
+        if current.weekday() < 5:
+            dates.append(current)
+        current += timedelta(days=1)
+    return dates
+
+
+def grouper_sessions(sessions):
+    """
+    Regroupe les sessions du JSON par jour, en une seule passe.
+
+    Args:
+        sessions: Liste de sessions {"date", "debut", "fin", ...}
+
+    Returns:
+        Liste de (jour, sessions du jour) triée par jour ; les sessions d'un
+        même jour gardent l'ordre du JSON
+    """
+    par_jour = defaultdict(list)
+    for session in sessions:
+        par_jour[parse_date(session["date"])].append(session)
+    return sorted(par_jour.items(), key=lambda jour_sessions: jour_sessions[0])
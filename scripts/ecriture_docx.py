@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Écriture des documents générés sans réécrire tout le paquet DOCX.
+Les générateurs ne modifient que le corps du document et ses en-têtes/pieds
+de page : ces parties sont sérialisées et compressées, tous les autres
+membres du zip (images, styles, thème, polices, réglages...) sont recopiés
+octet pour octet, déjà compressés, depuis le template.
+Si le document a des parties ou des relations absentes du template, on
+revient à l'enregistrement complet de python-docx.
+
+enregistrer_docx_flux écrit en plus le corps au fil de l'eau (page par page,
+ligne par ligne) dans le membre word/document.xml, sans garder tout le
+document en mémoire.
+"""
+
+import os
+import struct
+import zipfile
+import zlib
+from functools import partial
+from commun import RT, qn
+from mesures import compter, phase
+from template_cache import charger_template_parse
+
+
+# Membres bruts des templates déjà lus : chemin absolu -> (mtime, ModeleZip)
+_modeles = {}
+
+# Bit 3 des flags : tailles et CRC dans un descripteur après les données (membres écrits en flux)
+_FLAG_DESCRIPTEUR = 0x08
+# Bit 11 des flags : nom du membre encodé en UTF-8
+_FLAG_UTF8 = 0x800
+
+# Commentaire repère de la place du corps dans le squelette de document.xml
+_REPERE = "ecriture_docx:corps"
+
+# Enfants d'un Flux sérialisés ensemble (ex: lignes d'un tableau)
+ENFANTS_PAR_LOT = 64
+
+
+class _Membre:
+    """Membre du zip prêt à écrire : données compressées et métadonnées."""
+
+    __slots__ = ("nom", "donnees", "methode", "crc", "taille", "date_time", "flags")
+
+    def __init__(self, nom, donnees, methode, crc, taille, date_time, flags):
+        self.nom = nom
+        self.donnees = donnees
+        self.methode = methode
+        self.crc = crc
+        self.taille = taille
+        self.date_time = date_time
+        self.flags = flags
+
+
+class _MembreFlux:
+    """Membre du zip écrit au fil de l'eau : `produire(ecrire)` en fournit les données par morceaux."""
+
+    __slots__ = ("nom", "produire", "date_time")
+
+    def __init__(self, nom, produire, date_time):
+        self.nom = nom
+        self.produire = produire
+        self.date_time = date_time
+
+
+class ModeleZip:
+    """Membres bruts (compressés) d'un template, dans l'ordre du zip, et relations de ses parties modifiables."""
+
+    def __init__(self, template_path):
+        self.membres = []
+        with open(template_path, "rb") as f, zipfile.ZipFile(f) as archive:
+            for info in archive.infolist():
+                # En-tête local : 30 octets, puis nom et extra de longueurs variables
+                f.seek(info.header_offset)
+                entete = f.read(30)
+                longueur_nom, longueur_extra = struct.unpack("<HH", entete[26:30])
+                f.seek(info.header_offset + 30 + longueur_nom + longueur_extra)
+                self.membres.append(_Membre(
+                    info.filename, f.read(info.compress_size), info.compress_type, info.CRC,
+                    info.file_size, info.date_time, info.flag_bits & ~_FLAG_DESCRIPTEUR
+                ))
+        self.noms = {membre.nom for membre in self.membres}
+        self.relations = {
+            _nom_membre(part): _relations(part)
+            for part in parties_modifiables(charger_template_parse(template_path))
+        }
+
+
+def _nom_membre(part):
+    """Nom du membre zip d'une partie (partname sans le / initial)."""
+    return str(part.partname).lstrip("/")
+
+
+def _relations(part):
+    """Relations sortantes d'une partie, comparables d'un document à l'autre."""
+    return sorted((rId, rel.reltype, rel.target_ref) for rId, rel in part.rels.items())
+
+
+def parties_modifiables(doc):
+    """Parties que les générateurs modifient : document principal, en-têtes et pieds de page."""
+    parties = [doc.part]
+    for rel in doc.part.rels.values():
+        if not rel.is_external and rel.reltype in (RT.HEADER, RT.FOOTER):
+            parties.append(rel.target_part)
+    return parties
+
+
+def modele_zip(template_path):
+    """Retourne les membres bruts du template (lus une seule fois, clé : chemin + mtime)."""
+    chemin = os.path.abspath(template_path)
+    mtime = os.path.getmtime(chemin)
+
+    entree = _modeles.get(chemin)
+    if entree is None or entree[0] != mtime:
+        entree = (mtime, ModeleZip(chemin))
+        _modeles[chemin] = entree
+    return entree[1]
+
+
+def _compresser(nom, donnees, date_time):
+    compresseur = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    compresse = compresseur.compress(donnees) + compresseur.flush()
+    return _Membre(nom, compresse, zipfile.ZIP_DEFLATED, zlib.crc32(donnees), len(donnees), date_time, 0)
+
+
+def _date_dos(date_time):
+    annee, mois, jour, heure, minute, seconde = date_time
+    return (heure << 11) | (minute << 5) | (seconde // 2), ((annee - 1980) << 9) | (mois << 5) | jour
+
+
+def _ecrire_flux(f, produire):
+    """
+    Compresse au fil de l'eau les données fournies par `produire(ecrire)` dans `f`.
+    Retourne (CRC, taille compressée, taille).
+    """
+    compresseur = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    crc = taille = taille_compressee = 0
+
+    def ecrire(donnees):
+        nonlocal crc, taille, taille_compressee
+        crc = zlib.crc32(donnees, crc)
+        taille += len(donnees)
+        compresse = compresseur.compress(donnees)
+        f.write(compresse)
+        taille_compressee += len(compresse)
+
+    produire(ecrire)
+    reste = compresseur.flush()
+    f.write(reste)
+    return crc, taille_compressee + len(reste), taille
+
+
+def _ecrire_zip(output_path, membres):
+    """
+    Écrit les membres (déjà compressés, ou _MembreFlux) dans un zip : en-têtes locaux,
+    données, répertoire central, fin. Retourne la taille du fichier écrit.
+    """
+    repertoire = []
+    position = 0
+    with open(output_path, "wb") as f:
+        for membre in membres:
+            nom = membre.nom.encode("utf-8")
+            utf8 = _FLAG_UTF8 if not membre.nom.isascii() else 0
+            heure, date = _date_dos(membre.date_time)
+            if isinstance(membre, _MembreFlux):
+                # CRC et tailles connus seulement à la fin : en-tête à zéro, puis descripteur
+                flags = _FLAG_DESCRIPTEUR | utf8
+                f.write(struct.pack("<IHHHHHIIIHH", 0x04034B50, 20, flags, zipfile.ZIP_DEFLATED,
+                                    heure, date, 0, 0, 0, len(nom), 0))
+                f.write(nom)
+                crc, taille_compressee, taille = _ecrire_flux(f, membre.produire)
+                f.write(struct.pack("<IIII", 0x08074B50, crc, taille_compressee, taille))
+                champs = (flags, zipfile.ZIP_DEFLATED, heure, date, crc, taille_compressee, taille, len(nom))
+                longueur = 30 + len(nom) + taille_compressee + 16
+            else:
+                champs = (membre.flags | utf8, membre.methode, heure, date, membre.crc,
+                          len(membre.donnees), membre.taille, len(nom))
+                f.write(struct.pack("<IHHHHHIIIHH", 0x04034B50, 20, *champs, 0))
+                f.write(nom)
+                f.write(membre.donnees)
+                longueur = 30 + len(nom) + len(membre.donnees)
+            repertoire.append(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, 20, 20, *champs, 0, 0, 0, 0, 0, position))
+            repertoire.append(nom)
+            position += longueur
+
+        taille_repertoire = sum(len(morceau) for morceau in repertoire)
+        fin = struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, len(membres), len(membres), taille_repertoire, position, 0)
+        f.writelines(repertoire)
+        f.write(fin)
+    return position + taille_repertoire + len(fin)
+
+
+def _paquet_du_template(doc, modele, parties):
+    """Vrai si le document n'a ni partie ni relation absente du template (écriture membre par membre possible)."""
+    noms_document = {_nom_membre(part) for part in doc.part.package.iter_parts()}
+    return noms_document <= modele.noms and all(
+        modele.relations.get(nom) == _relations(part) for nom, part in parties.items()
+    )
+
+
+def enregistrer_docx(doc, template_path, output_path):
+    """
+    Enregistre un document issu de `template_path` en ne recompressant que ses parties modifiables.
+
+    Args:
+        doc: Document (copie du template modifiée par un générateur)
+        template_path: Template dont le document est issu
+        output_path: Chemin du fichier DOCX à écrire
+    """
+    with phase("enregistrement"):
+        taille = _enregistrer(doc, template_path, output_path)
+    compter("documents")
+    compter("octets_ecrits", taille)
+
+
+def _enregistrer(doc, template_path, output_path):
+    """Écrit le document et retourne la taille du fichier en octets."""
+    modele = modele_zip(template_path)
+    parties = {_nom_membre(part): part for part in parties_modifiables(doc)}
+
+    # Nouvelles parties ou relations (image ajoutée, lien...) : enregistrement complet
+    if not _paquet_du_template(doc, modele, parties):
+        doc.save(output_path)
+        return os.path.getsize(output_path)
+
+    membres = [
+        _compresser(membre.nom, parties[membre.nom].blob, membre.date_time) if membre.nom in parties else membre
+        for membre in modele.membres
+    ]
+    return _ecrire_zip(output_path, membres)
+
+
+class Flux:
+    """
+    Élément du corps écrit en flux : l'élément tel quel (avec ses premiers enfants,
+    ex: ligne d'en-tête d'un tableau), puis `enfants` produits un à un à sa suite.
+    """
+
+    __slots__ = ("element", "enfants")
+
+    def __init__(self, element, enfants):
+        self.element = element
+        self.enfants = enfants
+
+
+def _contenu(tag, nsmap, enfants):
+    """
+    Sérialisation de `enfants` placés dans un parent neuf `tag` qui déclare les espaces
+    de noms `nsmap` (sans la balise du parent) : aucune déclaration répétée sur chaque
+    enfant. Les enfants sont déplacés dans ce parent, libéré avec eux.
+    """
+    from lxml import etree
+    parent = etree.Element(tag, nsmap=nsmap)
+    parent.extend(enfants)
+    xml = etree.tostring(parent, encoding="utf-8", xml_declaration=False)
+    return xml[xml.index(b">") + 1:xml.rindex(b"</")]
+
+
+def _placer_repere(body, ancre):
+    """
+    Commentaire repère à la place du corps écrit en flux : celle de `ancre` (retirée),
+    ou la fin du corps, avant le sectPr.
+    """
+    from lxml import etree
+    commentaire = etree.Comment(_REPERE)
+    if ancre is not None:
+        ancre.addprevious(commentaire)
+        ancre.getparent().remove(ancre)
+    else:
+        sectPr = body.find(qn("w:sectPr"))
+        if sectPr is not None:
+            sectPr.addprevious(commentaire)
+        else:
+            body.append(commentaire)
+    return commentaire
+
+
+def _ecrire_document(doc, corps, ancre, ecrire):
+    """
+    Écrit word/document.xml : le squelette du document, avec les éléments de `corps`
+    sérialisés un à un à la place de `ancre` (ou à la fin du corps, avant le sectPr).
+    Le XML produit est celui de l'enregistrement complet du même document.
+    """
+    from lxml import etree
+    repere = "<!--{}-->".format(_REPERE).encode()
+    body = doc.element.body
+    commentaire = _placer_repere(body, ancre)
+    with phase("enregistrement"):
+        avant, apres = doc.part.blob.split(repere)
+    commentaire.getparent().remove(commentaire)
+
+    nsmap = doc.element.nsmap
+    ecrire(avant)
+    for element in corps:
+        if not isinstance(element, Flux):
+            with phase("enregistrement"):
+                ecrire(_contenu(body.tag, nsmap, [element]))
+            continue
+
+        # Élément ouvert, enfants écrits par lots, puis fermeture
+        tag = element.element.tag
+        with phase("enregistrement"):
+            element.element.append(etree.Comment(_REPERE))
+            debut, fin = _contenu(body.tag, nsmap, [element.element]).split(repere)
+            ecrire(debut)
+        lot = []
+        for enfant in element.enfants:
+            lot.append(enfant)
+            if len(lot) >= ENFANTS_PAR_LOT:
+                with phase("enregistrement"):
+                    ecrire(_contenu(tag, nsmap, lot))
+                lot = []
+        with phase("enregistrement"):
+            if lot:
+                ecrire(_contenu(tag, nsmap, lot))
+            ecrire(fin)
+    ecrire(apres)
+
+
+def enregistrer_docx_flux(doc, template_path, output_path, corps, ancre=None):
+    """
+    Enregistre un document en écrivant son corps au fil de l'eau, directement dans le
+    membre word/document.xml du zip : chaque élément de `corps` est sérialisé, compressé
+    puis oublié. La mémoire ne dépend pas du nombre de pages ou de lignes.
+
+    Args:
+        doc: Copie du template, déjà remplie, sans les éléments de `corps`
+        template_path: Template dont le document est issu
+        output_path: Chemin du fichier DOCX à écrire
+        corps: Itérable (paresseux) des éléments du corps, dans l'ordre : w:p, w:tbl ou Flux
+        ancre: Élément du corps remplacé par `corps` (défaut: fin du corps, avant le sectPr)
+    """
+    modele = modele_zip(template_path)
+    parties = {_nom_membre(part): part for part in parties_modifiables(doc)}
+
+    if not _paquet_du_template(doc, modele, parties):
+        # Enregistrement complet : le corps est assemblé en mémoire
+        commentaire = _placer_repere(doc.element.body, ancre)
+        for element in corps:
+            if isinstance(element, Flux):
+                element.element.extend(element.enfants)
+                element = element.element
+            commentaire.addprevious(element)
+        commentaire.getparent().remove(commentaire)
+        enregistrer_docx(doc, template_path, output_path)
+        return
+
+    nom_document = _nom_membre(doc.part)
+    membres = []
+    for membre in modele.membres:
+        if membre.nom == nom_document:
+            membre = _MembreFlux(nom_document, partial(_ecrire_document, doc, corps, ancre), membre.date_time)
+        elif membre.nom in parties:
+            with phase("enregistrement"):
+                membre = _compresser(membre.nom, parties[membre.nom].blob, membre.date_time)
+        membres.append(membre)
+
+    # Fichier provisoire : un document interrompu en cours de flux ne remplace pas l'ancien
+    provisoire = output_path + ".partiel"
+    try:
+        taille = _ecrire_zip(provisoire, membres)
+        os.replace(provisoire, output_path)
+    finally:
+        if os.path.exists(provisoire):
+            os.remove(provisoire)
+    compter("documents")
+    compter("octets_ecrits", taille)
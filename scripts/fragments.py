@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fragments OOXML précompilés (bordures, fond gris, propriétés de run Calibri).
+Chaque fragment est construit une seule fois ; les appelants en insèrent une
+copie avec `cloner` ou `remplacer_enfant` au lieu de reconstruire l'arbre XML.
+"""
+
+from copy import deepcopy
+from functools import lru_cache
+from commun import nsdecls, parse_xml
+
+
+GRIS = "D3D3D3"
+
+
+def _bordures(tag, cotes, color, size):
+    bordures = "".join(
+        f'<w:{cote} w:val="single" w:sz="{size}" w:space="0" w:color="{color}"/>' for cote in cotes
+    )
+    return parse_xml(f'<w:{tag} {nsdecls("w")}>{bordures}</w:{tag}>')
+
+
+@lru_cache(maxsize=None)
+def bordures_cellule(color="000000", size="6"):
+    """w:tcBorders : bordure simple sur les 4 côtés d'une cellule."""
+    return _bordures("tcBorders", ["top", "left", "bottom", "right"], color, size)
+
+
+@lru_cache(maxsize=None)
+def bordures_tableau(color="000000", size="6"):
+    """w:tblBorders : bordures extérieures et intérieures d'un tableau."""
+    return _bordures("tblBorders", ["top", "left", "bottom", "right", "insideH", "insideV"], color, size)
+
+
+@lru_cache(maxsize=None)
+def fond(color=GRIS):
+    """w:shd : fond uni d'une cellule."""
+    return parse_xml(f'<w:shd {nsdecls("w")} w:val="clear" w:fill="{color}"/>')
+
+
+@lru_cache(maxsize=None)
+def rpr_calibri(demi_points, gras=False):
+    """w:rPr : police Calibri, taille en demi-points (18 = 9pt, 22 = 11pt), gras optionnel."""
+    gras_xml = "<w:b/>" if gras else ""
+    return parse_xml(
+        f'<w:rPr {nsdecls("w")}><w:rFonts w:ascii="Calibri" w:hAnsi="Calibri"/>'
+        f'{gras_xml}<w:sz w:val="{demi_points}"/></w:rPr>'
+    )
+
+
+def cloner(fragment):
+    """Retourne une copie modifiable d'un fragment."""
+    return deepcopy(fragment)
+
+
+def remplacer_enfant(parent, fragment):
+    """
+    Insère une copie du fragment dans `parent` en remplaçant les éléments de même
+    balise (à la place du premier), ou à la fin s'il n'y en a pas.
+    """
+    copie = deepcopy(fragment)
+    existants = parent.findall(fragment.tag)
+    if existants:
+        existants[0].addprevious(copie)
+        for element in existants:
+            parent.remove(element)
+    else:
+        parent.append(copie)
+    return copie
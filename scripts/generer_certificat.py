@@ -6,40 +6,131 @@ Utilise le template "certificat_de_réalisation template.docx" comme base.
 Génère un certificat par apprenant.
 """
 
+import argparse
+import contextlib
 import json
-import sys
 import os
-from datetime import datetime
-from pathlib import Path
-from docx import Document
+import sys
+from copy import deepcopy
+from commun import _Body, OxmlElement, qn, charger_json, quitter_invalide, trouver_template, verifier_ou_quitter, convertisseur_ou_quitter, options_communes
+from dates import format_date_short, parse_date
+from template_cache import charger_template
+from placeholders import Marqueurs
+from ecriture_docx import enregistrer_docx
+from parallele import EchecsApprenants, echecs, executer_par_apprenant
+from apprenants import lire_apprenants
+from conversion_pdf import chemin_pdf, decouper_pdf, pdf_a_jour
+from progression import point_annulation, signaler
+from mesures import compter, profiler, sorties
+from schema import SchemaInvalide, valider
+from incremental import Manifeste, Selection, empreinte_generation, selectionner
 
 
-def format_date_fr(date_obj):
-    """Formate une date en français (ex: 16 décembre 2024)."""
-    mois = [
-        "", "janvier", "février", "mars", "avril", "mai", "juin",
-        "juillet", "août", "septembre", "octobre", "novembre", "décembre"
-    ]
-    return f"{date_obj.day} {mois[date_obj.month]} {date_obj.year}"
+# Version du rendu : à incrémenter quand la mise en forme produite change
+VERSION_GENERATEUR = 2
 
+# Marqueurs du template, remplacés en une seule passe
+MARQUEURS = Marqueurs([
+    "NOM PRENOM", "NOM DE LA FORMATION", "DATE DÉBUT", "DATE FIN", "NOMBREHEURES",
+    "Fait à : DATE", "Le : LIEU",
+])
 
-def format_date_short(date_obj):
-    """Formate une date en format court (ex: 16/12/2024)."""
-    return date_obj.strftime("%d/%m/%Y")
 
+def nom_fichier_certificat(apprenant):
+    """Nom du fichier : Certificat_NOM_Prenom.docx"""
+    nom_clean = apprenant.get("nom", "").replace(" ", "_")
+    prenom_clean = apprenant.get("prenom", "").replace(" ", "_")
+    return f"Certificat_{nom_clean}_{prenom_clean}.docx"
 
-def parse_date(date_str):
-    """Parse une date en différents formats."""
-    formats = ["%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%y"]
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str, fmt)
-        except ValueError:
-            continue
-    raise ValueError(f"Format de date non reconnu: {date_str}")
 
+def nom_fichier_certificats_groupes(nom_formation):
+    """Nom du document groupé : Certificats_Nom_de_la_formation.docx"""
+    nom_clean = "".join(c if c.isalnum() or c in " -_" else "" for c in nom_formation)
+    return f"Certificats_{nom_clean.replace(' ', '_')[:50]}.docx"
 
-def generer_certificat(data: dict, output_dir: str = None, template_path: str = "certificat_de_réalisation template.docx"):
+
+def _remplir_certificat(conteneur, contexte, apprenant):
+    """
+    Remplit le certificat d'un apprenant.
+    `conteneur` est le Document ou un corps (_Body) cloné du template.
+    """
+    nom = apprenant["nom"]
+    prenom = apprenant["prenom"]
+    
+    # Paragraphes et tableaux en une seule passe (les runs d'images ne contiennent pas de texte)
+    MARQUEURS.remplir(conteneur._element, {
+        "NOM PRENOM": f"{nom} {prenom}",
+        "NOM DE LA FORMATION": contexte["nom_formation"],
+        "DATE DÉBUT": contexte["date_debut"],
+        "DATE FIN": contexte["date_fin"],
+        "NOMBREHEURES": contexte["duree_heures"],
+        # Correction de l'inversion dans le template
+        "Fait à : DATE": f"Fait à : {contexte['lieu_signature']}",
+        "Le : LIEU": f"Le : {contexte['date_signature']}",
+    })
+    
+    # Supprimer les paragraphes vides à la fin pour tenir sur une page
+    while conteneur.paragraphs and not conteneur.paragraphs[-1].text.strip():
+        p = conteneur.paragraphs[-1]._element
+        p.getparent().remove(p)
+
+
+def _generer_certificat_apprenant(contexte, apprenant):
+    """Génère le certificat d'un apprenant et retourne le chemin du fichier."""
+    # Copie du template (parsé une seule fois par processus)
+    doc = charger_template(contexte["template_path"])
+    _remplir_certificat(doc, contexte, apprenant)
+    
+    output_path = os.path.join(contexte["dossier_sortie"], nom_fichier_certificat(apprenant))
+    
+    enregistrer_docx(doc, contexte["template_path"], output_path)
+    return output_path
+
+
+def _generer_certificats_groupes(contexte, apprenants, output_path):
+    """
+    Génère un seul document contenant le certificat de chaque apprenant, un par page.
+    Chaque certificat est une section (saut de section page suivante) : il retrouve
+    l'en-tête de première page et la numérotation du template.
+    """
+    doc = charger_template(contexte["template_path"])
+    body = doc.element.body
+    sectPr = body.find(qn('w:sectPr'))
+    modele = deepcopy(body)
+    for element in list(body):
+        if element is not sectPr:
+            body.remove(element)
+    
+    # Identifiants des images : uniques dans tout le document
+    docPr_ids = [int(docPr.get('id')) for docPr in modele.iter(qn('wp:docPr'))]
+    prochain_id = max(docPr_ids, default=0) + 1
+    
+    for i, apprenant in enumerate(apprenants):
+        point_annulation()
+        corps = deepcopy(modele)
+        _remplir_certificat(_Body(corps, doc.part), contexte, apprenant)
+        if i > 0:
+            for docPr in corps.iter(qn('wp:docPr')):
+                docPr.set('id', str(prochain_id))
+                prochain_id += 1
+        
+        elements = [element for element in corps if element.tag != qn('w:sectPr')]
+        # Fin de section après chaque certificat sauf le dernier (qui utilise le sectPr du corps)
+        if i < len(apprenants) - 1:
+            dernier = elements[-1]
+            if dernier.tag != qn('w:p'):
+                dernier = OxmlElement('w:p')
+                elements.append(dernier)
+            dernier.get_or_add_pPr().append(deepcopy(sectPr))
+        for element in elements:
+            sectPr.addprevious(element)
+    
+    enregistrer_docx(doc, contexte["template_path"], output_path)
+    return output_path
+
+
+def generer_certificat(data: dict, output_dir: str = None, template_path: str = "certificat_de_réalisation template.docx",
+                       workers: int = 1, force: bool = False, convertisseur=None, groupe: bool = False):
     """
     Génère un certificat de réalisation par apprenant.
     
@@ -47,20 +138,21 @@ def generer_certificat(data: dict, output_dir: str = None, template_path: str =
         data: Dictionnaire contenant les données de la formation
         output_dir: Dossier de sortie (défaut: dossier courant)
         template_path: Chemin vers le template Word
+        workers: Nombre de processus de rendu (1 = séquentiel, 0 = un par cœur)
+        force: Régénérer même les certificats dont les entrées n'ont pas changé
+        convertisseur: ConvertisseurPDF auquel soumettre chaque certificat (optionnel)
+        groupe: Un seul document avec une page par apprenant au lieu d'un fichier chacun
     
     Returns:
-        Liste des chemins des fichiers générés
+        Liste des chemins des certificats (régénérés ou inchangés), dans l'ordre des apprenants
+        (en mode groupé : le seul document généré)
     """
     
+    # Vérifier toutes les données avant le rendu (toutes les erreurs en une fois)
+    valider(data, "certificat")
+    
     # Trouver le template
-    template = Path(template_path)
-    if not template.exists():
-        # Chercher dans le dossier templates/ (à côté du dossier scripts/)
-        script_dir = Path(__file__).parent
-        template = script_dir.parent / "templates" / template_path
-        if not template.exists():
-            raise FileNotFoundError(f"Template non trouvé: {template_path}")
-    template_path = str(template)
+    template_path = trouver_template(template_path)
     
     # Parser les dates
     date_debut = parse_date(data["date_debut"])
@@ -78,116 +170,131 @@ def generer_certificat(data: dict, output_dir: str = None, template_path: str =
     print(f"   Formation : {data['nom_formation']}")
     print(f"   Du {format_date_short(date_debut)} au {format_date_short(date_fin)}")
     print(f"   Durée : {data['duree_heures']} heures")
-    print(f"   {len(data['apprenants'])} apprenant(s)")
+    if hasattr(data["apprenants"], "__len__"):
+        print(f"   {len(data['apprenants'])} apprenant(s)")
+    else:
+        print("   Apprenants lus au fil du fichier")
     
-    fichiers_generes = []
+    # Valeurs communes à tous les certificats (envoyées à chaque worker)
+    contexte = {
+        "template_path": template_path,
+        "nom_formation": data["nom_formation"],
+        "date_debut": format_date_short(date_debut),
+        "date_fin": format_date_short(date_fin),
+        "duree_heures": str(data["duree_heures"]),
+        "lieu_signature": lieu_signature,
+        "date_signature": format_date_short(date_signature),
+        # Dossier de sortie : output_dir, sinon dossier client, sinon dossier courant
+        "dossier_sortie": output_dir or data.get("_source_dir") or "",
+    }
     
-    for apprenant in data["apprenants"]:
-        nom = apprenant["nom"]
-        prenom = apprenant["prenom"]
-        nom_complet = f"{nom} {prenom}"
-        
-        # Charger le template
-        doc = Document(template_path)
-        
-        # Remplacements dans les paragraphes
-        for para in doc.paragraphs:
-            # D'abord tenter les remplacements run par run
-            for run in para.runs:
-                text = run.text
-                
-                # Données de l'apprenant et formation
-                text = text.replace("NOM PRENOM", nom_complet)
-                text = text.replace("NOM DE LA FORMATION", data["nom_formation"])
-                text = text.replace("DATE DÉBUT", format_date_short(date_debut))
-                text = text.replace("DATE FIN", format_date_short(date_fin))
-                text = text.replace("NOMBREHEURES", str(data["duree_heures"]))
-                
-                run.text = text
-            
-            # Gérer les cas où le texte est fragmenté entre plusieurs runs
-            # (ex: "Fait à : DATE" peut être sur plusieurs runs)
-            full_text = para.text
-            
-            # Correction de l'inversion dans le template
-            if "Fait à : DATE" in full_text:
-                # Reconstruire le paragraphe avec le bon texte
-                new_text = full_text.replace("Fait à : DATE", f"Fait à : {lieu_signature}")
-                para.clear()
-                para.add_run(new_text)
-            elif "LIEU" in full_text and "Le" in full_text:
-                # Gérer l'espace insécable (\xa0) dans le template
-                new_text = f"Le : {format_date_short(date_signature)}"
-                para.clear()
-                para.add_run(new_text)
-        
-        # Remplacements dans les tableaux (au cas où)
-        # ATTENTION: ne pas toucher aux runs qui contiennent des images
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for para in cell.paragraphs:
-                        for run in para.runs:
-                            # Vérifier si le run contient une image
-                            from docx.oxml.ns import qn
-                            if run._element.findall('.//' + qn('w:drawing')):
-                                continue  # Ne pas toucher aux images
-                            
-                            original_text = run.text
-                            text = original_text
-                            text = text.replace("NOM PRENOM", nom_complet)
-                            text = text.replace("NOM DE LA FORMATION", data["nom_formation"])
-                            text = text.replace("DATE DÉBUT", format_date_short(date_debut))
-                            text = text.replace("DATE FIN", format_date_short(date_fin))
-                            text = text.replace("NOMBREHEURES", str(data["duree_heures"]))
-                            if "Fait à : DATE" in text:
-                                text = text.replace("Fait à : DATE", f"Fait à : {lieu_signature}")
-                            if "Le : LIEU" in text:
-                                text = text.replace("Le : LIEU", f"Le : {format_date_short(date_signature)}")
-                            
-                            # Ne modifier que si le texte a changé
-                            if text != original_text:
-                                run.text = text
-        
-        # Supprimer les paragraphes vides à la fin pour tenir sur une page
-        while doc.paragraphs and not doc.paragraphs[-1].text.strip():
-            p = doc.paragraphs[-1]._element
-            p.getparent().remove(p)
-        
-        # Nom du fichier : Certificat_NOM_Prenom.docx
-        nom_clean = nom.replace(" ", "_")
-        prenom_clean = prenom.replace(" ", "_")
-        filename = f"Certificat_{nom_clean}_{prenom_clean}.docx"
-        
-        # Déterminer le chemin de sortie
-        if output_dir:
-            output_path = os.path.join(output_dir, filename)
-        elif "_source_dir" in data and data["_source_dir"]:
-            output_path = os.path.join(data["_source_dir"], filename)
-        else:
-            output_path = filename
-        
-        doc.save(output_path)
-        fichiers_generes.append(output_path)
-        print(f"   ✅ {filename}")
+    # Empreinte des entrées de chaque certificat : seuls ceux qui ont changé sont régénérés
+    dossier_sortie = contexte["dossier_sortie"]
+    manifeste = Manifeste(dossier_sortie)
+    valeurs = {k: v for k, v in contexte.items() if k not in ("template_path", "dossier_sortie")}
+    
+    if groupe:
+        # Un seul document, une page par apprenant (un flux d'apprenants est lu en entier)
+        apprenants = list(data["apprenants"])
+        output_path = os.path.join(dossier_sortie, nom_fichier_certificats_groupes(data["nom_formation"]))
+        empreinte_entrees = empreinte_generation(
+            VERSION_GENERATEUR, template_path, valeurs,
+            [(apprenant.get("nom"), apprenant.get("prenom")) for apprenant in apprenants]
+        )
+        a_generer, _ = selectionner(manifeste, [(output_path, empreinte_entrees)], force)
+        if a_generer:
+            _generer_certificats_groupes(contexte, apprenants, output_path)
+            compter("apprenants", len(apprenants))
+            manifeste.enregistrer(output_path, empreinte_entrees)
+            manifeste.sauver()
+            signaler("genere", f"   ✅ {os.path.basename(output_path)}", chemin=output_path)
+        if convertisseur is not None:
+            convertisseur.soumettre(output_path)
+        print(f"\n🎉 {len(apprenants)} certificat(s) dans {os.path.basename(output_path)}")
+        return [output_path]
+    
+    def cible(apprenant):
+        output_path = os.path.join(dossier_sortie, nom_fichier_certificat(apprenant))
+        return output_path, empreinte_generation(VERSION_GENERATEUR, template_path, valeurs,
+                                                 apprenant.get("nom"), apprenant.get("prenom"))
     
-    print(f"\n🎉 {len(fichiers_generes)} certificat(s) généré(s)")
-    return fichiers_generes
+    # Conversion PDF au fil de la génération (documents régénérés ou déjà à jour)
+    au_fichier = convertisseur.soumettre if convertisseur is not None else None
+    selection = Selection(manifeste, cible, force, au_inchange=au_fichier)
+    
+    # Les apprenants (liste ou flux) sont examinés et générés au fur et à mesure de la lecture
+    fichiers_generes, erreurs = executer_par_apprenant(
+        _generer_certificat_apprenant, contexte, selection.filtrer(data["apprenants"]), workers, au_fichier
+    )
+    selection.enregistrer(fichiers_generes)
+    
+    print(f"\n🎉 {len(fichiers_generes)} certificat(s) généré(s), {len(selection.inchanges)} inchangé(s)")
+    if erreurs:
+        print(f"⚠️  {len(erreurs)} certificat(s) en erreur")
+        # Les documents réussis sont conservés (et enregistrés dans le manifeste)
+        raise EchecsApprenants("certificat", selection.resultats(fichiers_generes), echecs(erreurs))
+    return selection.resultats(fichiers_generes)
 
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        json_path = sys.argv[1]
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        # Stocker le dossier client pour y générer les fichiers
-        # Si le JSON est dans un sous-dossier data/, remonter au dossier client
-        source_dir = os.path.dirname(os.path.abspath(json_path))
-        if os.path.basename(source_dir) == "data":
-            source_dir = os.path.dirname(source_dir)  # Remonter au dossier client
-        if source_dir and source_dir != os.getcwd():
-            data["_source_dir"] = source_dir
-        generer_certificat(data)
+    parser = argparse.ArgumentParser(description="Génère un certificat de réalisation par apprenant.")
+    parser.add_argument("json_path", nargs="?", help="Fichier JSON de la formation")
+    parser.add_argument("--apprenants", metavar="FICHIER",
+                        help="Liste des apprenants en CSV ou JSONL, lue au fil de la génération (remplace celle du JSON)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Nombre de processus de rendu (défaut: 1, 0 = un par cœur)")
+    parser.add_argument("--groupe", action="store_true",
+                        help="Un seul document avec une page par apprenant")
+    parser.add_argument("--decouper-pdf", action="store_true",
+                        help="Avec --groupe : convertir en PDF puis découper en un PDF par apprenant (pypdf)")
+    options_communes(parser, "les certificats")
+    args = parser.parse_args()
+    
+    if args.json_path:
+        # Les fichiers sont générés dans le dossier client
+        data = charger_json(args.json_path)
+        if args.apprenants:
+            try:
+                data["apprenants"] = lire_apprenants(args.apprenants, "certificat")
+            except OSError as e:
+                parser.error(f"--apprenants : {e}")
+        if args.groupe:
+            # Le document groupé et le découpage des PDF ont besoin de la liste complète
+            try:
+                data["apprenants"] = list(data["apprenants"])
+            except SchemaInvalide as e:
+                quitter_invalide(e)
+        verifier_ou_quitter(data, "certificat", seulement=args.verifier)
+        if args.decouper_pdf and not args.groupe:
+            parser.error("--decouper-pdf s'utilise avec --groupe")
+        # Le découpage part du PDF du document groupé
+        args.pdf = args.pdf or args.decouper_pdf
+        convertisseur = convertisseur_ou_quitter(parser, args)
+        try:
+            with profiler(sorties(args.profile, args.profile_jsonl), "certificat"), \
+                    (convertisseur or contextlib.nullcontext()):
+                fichiers = generer_certificat(data, workers=args.workers, force=args.force,
+                                              convertisseur=convertisseur, groupe=args.groupe)
+        except EchecsApprenants:
+            # Chaque échec a déjà été affiché
+            sys.exit(1)
+        except SchemaInvalide as e:
+            # Ligne invalide dans le fichier --apprenants (lu au fil de la génération)
+            quitter_invalide(e)
+        if args.decouper_pdf:
+            # Après la conversion du document groupé : un PDF par apprenant, à côté du DOCX
+            dossier = os.path.dirname(fichiers[0])
+            pdf_groupe = chemin_pdf(fichiers[0])
+            if not pdf_a_jour(fichiers[0]):
+                # Conversion du document groupé en erreur (déjà affichée) : pas de PDF, ou un ancien
+                parser.error(f"--decouper-pdf : PDF groupé introuvable ({os.path.basename(pdf_groupe)})")
+            try:
+                decouper_pdf(pdf_groupe, [
+                    chemin_pdf(os.path.join(dossier, nom_fichier_certificat(apprenant)))
+                    for apprenant in data["apprenants"]
+                ])
+            except (RuntimeError, ValueError) as e:
+                parser.error(str(e))
     else:
         # Exemple d'utilisation
         print("Usage: python3 generer_certificat.py <fichier.json>")
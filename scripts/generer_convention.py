@@ -6,66 +6,29 @@ Utilise le template "convention template.docx" comme base.
 Génère une convention par client/entreprise.
 """
 
+import argparse
+import contextlib
 import json
-import sys
 import os
 from datetime import datetime
-from pathlib import Path
-from docx import Document
-from docx.shared import Pt
-from copy import deepcopy
+from commun import charger_json, trouver_template, verifier_ou_quitter, convertisseur_ou_quitter, options_communes
+from dates import format_date_fr, format_date_short, parse_date
+from template_cache import charger_template
+from ecriture_docx import Flux, enregistrer_docx, enregistrer_docx_flux
+from placeholders import index_placeholders, puces
+from prototypes import prototype_ligne_table
+from mesures import compter, phase, profiler, sorties
+from schema import valider
+from progression import point_annulation, signaler
+from incremental import Manifeste, empreinte_generation
 
 
-def format_date_fr(date_obj):
-    """Formate une date en français (ex: 16 décembre 2024)."""
-    mois = [
-        "", "janvier", "février", "mars", "avril", "mai", "juin",
-        "juillet", "août", "septembre", "octobre", "novembre", "décembre"
-    ]
-    return f"{date_obj.day} {mois[date_obj.month]} {date_obj.year}"
-
-
-def format_date_short(date_obj):
-    """Formate une date en format court (ex: 16/12/2024)."""
-    return date_obj.strftime("%d/%m/%Y")
-
+# Version du rendu : à incrémenter quand la mise en forme produite change
+VERSION_GENERATEUR = 2
 
-def parse_date(date_str):
-    """Parse une date en différents formats."""
-    formats = ["%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%y"]
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str, fmt)
-        except ValueError:
-            continue
-    raise ValueError(f"Format de date non reconnu: {date_str}")
 
-
-def replace_in_paragraph(para, old_text, new_text):
-    """Remplace le texte dans un paragraphe en préservant le formatage si possible."""
-    if old_text not in para.text:
-        return False
-    
-    # Essayer de remplacer dans chaque run
-    for run in para.runs:
-        if old_text in run.text:
-            run.text = run.text.replace(old_text, new_text)
-            return True
-    
-    # Si fragmenté entre plusieurs runs, reconstruire le paragraphe
-    new_full_text = para.text.replace(old_text, new_text)
-    para.clear()
-    para.add_run(new_full_text)
-    return True
-
-
-def replace_in_cell(cell, old_text, new_text):
-    """Remplace le texte dans une cellule de tableau."""
-    for para in cell.paragraphs:
-        replace_in_paragraph(para, old_text, new_text)
-
-
-def generer_convention(data: dict, output_dir: str = None, template_path: str = "convention template.docx"):
+def generer_convention(data: dict, output_dir: str = None, template_path: str = "convention template.docx",
+                       force: bool = False, convertisseur=None, flux: bool = False):
     """
     Génère une convention de formation professionnelle.
     
@@ -73,19 +36,19 @@ def generer_convention(data: dict, output_dir: str = None, template_path: str =
         data: Dictionnaire contenant les données de la convention
         output_dir: Dossier de sortie (défaut: dossier courant)
         template_path: Chemin vers le template Word
+        force: Régénérer même si les entrées n'ont pas changé
+        convertisseur: ConvertisseurPDF auquel soumettre le document (optionnel)
+        flux: Écrire les lignes des participants dans le fichier au fur et à mesure (mémoire constante)
     
     Returns:
-        Chemin du fichier généré
+        Chemin du fichier généré (ou inchangé)
     """
     
+    # Vérifier toutes les données avant le rendu (toutes les erreurs en une fois)
+    valider(data, "convention")
+    
     # Trouver le template
-    template = Path(template_path)
-    if not template.exists():
-        script_dir = Path(__file__).parent
-        template = script_dir.parent / "templates" / template_path
-        if not template.exists():
-            raise FileNotFoundError(f"Template non trouvé: {template_path}")
-    template_path = str(template)
+    template_path = trouver_template(template_path)
     
     # Parser les dates
     date_debut = parse_date(data["date_debut"])
@@ -148,9 +111,6 @@ def generer_convention(data: dict, output_dir: str = None, template_path: str =
     print(f"   Durée : {duree_heures} heures ({duree_jours} jours)")
     print(f"   {len(apprenants)} participant(s)")
     
-    # Charger le template
-    doc = Document(template_path)
-    
     # Préparer les remplacements
     replacements = {
         # Bénéficiaire
@@ -194,60 +154,8 @@ def generer_convention(data: dict, output_dir: str = None, template_path: str =
         "{{LIEU_SIGNATURE}}": lieu_signature,
     }
     
-    # Remplacements dans les paragraphes
-    for para in doc.paragraphs:
-        for old, new in replacements.items():
-            replace_in_paragraph(para, old, new)
-        
-        # Gérer le contenu pédagogique (liste)
-        if "{{CONTENU_PEDAGOGIQUE}}" in para.text:
-            # Remplacer par la liste des items
-            if contenu_pedagogique:
-                para.clear()
-                for i, item in enumerate(contenu_pedagogique):
-                    if i > 0:
-                        para.add_run("\n")
-                    para.add_run(f"• {item}")
-            else:
-                replace_in_paragraph(para, "{{CONTENU_PEDAGOGIQUE}}", "")
-    
-    # Remplacements dans les tableaux
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for old, new in replacements.items():
-                    replace_in_cell(cell, old, new)
-    
-    # Gérer le tableau des participants (tableau 0 généralement)
-    if len(doc.tables) > 0 and apprenants:
-        # Trouver le tableau des participants (celui avec Nom | Prénom | Fonction | E-mail)
-        for table in doc.tables:
-            header_text = " ".join([cell.text for cell in table.rows[0].cells]).lower()
-            if "nom" in header_text and "prénom" in header_text:
-                # C'est le tableau des participants
-                # Supprimer les lignes existantes sauf l'en-tête
-                while len(table.rows) > 1:
-                    tr = table.rows[-1]._tr
-                    table._tbl.remove(tr)
-                
-                # Ajouter une ligne par participant
-                for apprenant in apprenants:
-                    new_row = table.add_row()
-                    cells_data = [
-                        apprenant.get("nom", ""),
-                        apprenant.get("prenom", ""),
-                        apprenant.get("fonction", ""),
-                        apprenant.get("email", "")
-                    ]
-                    for i, text in enumerate(cells_data):
-                        if i < len(new_row.cells):
-                            cell = new_row.cells[i]
-                            cell.text = ""
-                            para = cell.paragraphs[0]
-                            run = para.add_run(text)
-                            run.font.name = "Calibri"
-                            run.font.size = Pt(11)
-                break
+    # Contenu pédagogique : liste à puces, une ligne par élément
+    replacements["{{CONTENU_PEDAGOGIQUE}}"] = puces(contenu_pedagogique)
     
     # Nom du fichier
     nom_clean = nom_entreprise.replace(" ", "_").replace("/", "-")
@@ -261,26 +169,94 @@ def generer_convention(data: dict, output_dir: str = None, template_path: str =
     else:
         output_path = filename
     
-    doc.save(output_path)
-    print(f"   ✅ {filename}")
+    # Participants du tableau (Nom | Prénom | Fonction | E-mail)
+    participants = [
+        (
+            apprenant.get("nom", ""),
+            apprenant.get("prenom", ""),
+            apprenant.get("fonction", ""),
+            apprenant.get("email", "")
+        )
+        for apprenant in apprenants
+    ]
+    
+    # Rien à faire si la convention existe déjà pour les mêmes entrées
+    manifeste = Manifeste(os.path.dirname(output_path))
+    empreinte_entrees = empreinte_generation(
+        VERSION_GENERATEUR, template_path, replacements, participants
+    )
+    if not force and manifeste.a_jour(output_path, empreinte_entrees):
+        signaler("inchange", f"   ⏭️  {filename} (inchangé)", chemin=output_path)
+        if convertisseur is not None:
+            convertisseur.soumettre(output_path)
+        return output_path
+    
+    # Copie du template (parsé une seule fois par processus)
+    doc = charger_template(template_path)
+    index = index_placeholders(template_path)
+    
+    # Remplacements aux emplacements repérés dans le template (paragraphes et tableaux)
+    index.remplir(doc, replacements)
+    
+    # Gérer le tableau des participants (tableau 0 généralement)
+    tableau_flux = None
+    with phase("tableaux"):
+        if len(doc.tables) > 0 and apprenants:
+            # Trouver le tableau des participants (celui avec Nom | Prénom | Fonction | E-mail)
+            for table in doc.tables:
+                header_text = " ".join([cell.text for cell in table.rows[0].cells]).lower()
+                if "nom" in header_text and "prénom" in header_text:
+                    # C'est le tableau des participants
+                    # Supprimer les lignes existantes sauf l'en-tête
+                    while len(table.rows) > 1:
+                        tr = table.rows[-1]._tr
+                        table._tbl.remove(tr)
+                    
+                    # Ajouter une ligne par participant (copies d'une ligne prototype)
+                    prototype = prototype_ligne_table(table)
+                    def lignes():
+                        for participant in participants:
+                            point_annulation()
+                            yield prototype.creer(*participant)
+                    if flux:
+                        # Lignes créées au moment de l'écriture du tableau
+                        tableau_flux = Flux(table._tbl, lignes())
+                    else:
+                        table._tbl.extend(lignes())
+                    compter("lignes", len(participants))
+                    break
+    
+    if tableau_flux is not None:
+        enregistrer_docx_flux(doc, template_path, output_path, [tableau_flux], ancre=tableau_flux.element)
+    else:
+        enregistrer_docx(doc, template_path, output_path)
+    manifeste.enregistrer(output_path, empreinte_entrees)
+    manifeste.sauver()
+    if convertisseur is not None:
+        convertisseur.soumettre(output_path)
+    signaler("genere", f"   ✅ {filename}", chemin=output_path)
     print(f"\n🎉 Convention générée : {output_path}")
     
     return output_path
 
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        json_path = sys.argv[1]
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        source_dir = os.path.dirname(os.path.abspath(json_path))
-        if os.path.basename(source_dir) == "data":
-            source_dir = os.path.dirname(source_dir)
-        if source_dir and source_dir != os.getcwd():
-            data["_source_dir"] = source_dir
-        generer_convention(data)
+    parser = argparse.ArgumentParser(description="Génère la convention de formation d'une entreprise.")
+    parser.add_argument("json_path", nargs="?", help="Fichier JSON de la formation")
+    parser.add_argument("--flux", action="store_true",
+                        help="Écrire les lignes des participants au fur et à mesure (mémoire constante)")
+    options_communes(parser, "le document")
+    args = parser.parse_args()
+    
+    if args.json_path:
+        data = charger_json(args.json_path)
+        verifier_ou_quitter(data, "convention", seulement=args.verifier)
+        convertisseur = convertisseur_ou_quitter(parser, args)
+        with profiler(sorties(args.profile, args.profile_jsonl), "convention"), \
+                (convertisseur or contextlib.nullcontext()):
+            generer_convention(data, force=args.force, convertisseur=convertisseur, flux=args.flux)
     else:
-        print("Usage: python3 generer_convention.py <fichier.json>")
+        print("Usage: python3 generer_convention.py <fichier.json> [--force] [--pdf] [--verifier] [--flux] [--profile]")
         print("\nExemple de structure JSON:")
         exemple = {
             "beneficiaire": {
@@ -6,55 +6,25 @@ Utilise le template "convocation template.docx" comme base.
 Génère une convocation par apprenant.
 """
 
+import argparse
+import contextlib
 import json
-import sys
 import os
+import sys
 from datetime import datetime
-from pathlib import Path
-from docx import Document
-from docx.table import _Cell
-from docx.shared import Cm, Pt
-from docx.oxml.ns import nsdecls
-from docx.oxml import parse_xml
+from commun import Cm, charger_json, quitter_invalide, trouver_template, verifier_ou_quitter, convertisseur_ou_quitter, options_communes
 from copy import deepcopy
-
-
-def format_date_fr(date_obj):
-    """Formate une date en français (ex: 16 décembre 2024)."""
-    mois = [
-        "", "janvier", "février", "mars", "avril", "mai", "juin",
-        "juillet", "août", "septembre", "octobre", "novembre", "décembre"
-    ]
-    return f"{date_obj.day} {mois[date_obj.month]} {date_obj.year}"
-
-
-def parse_date(date_str):
-    """Parse une date en différents formats."""
-    formats = ["%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%y"]
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str, fmt)
-        except ValueError:
-            continue
-    raise ValueError(f"Format de date non reconnu: {date_str}")
-
-
-def replace_in_paragraph(para, old_text, new_text):
-    """Remplace le texte dans un paragraphe en préservant le formatage si possible."""
-    if old_text not in para.text:
-        return False
-    
-    # Essayer de remplacer dans chaque run
-    for run in para.runs:
-        if old_text in run.text:
-            run.text = run.text.replace(old_text, new_text)
-            return True
-    
-    # Si fragmenté entre plusieurs runs, reconstruire le paragraphe
-    new_full_text = para.text.replace(old_text, new_text)
-    para.clear()
-    para.add_run(new_full_text)
-    return True
+from dates import format_date_fr, grouper_sessions, parse_date
+from template_cache import charger_template
+from ecriture_docx import enregistrer_docx
+from parallele import EchecsApprenants, echecs, executer_par_apprenant
+from mesures import compter, phase, profiler, sorties
+from apprenants import lire_apprenants
+from schema import SchemaInvalide, valider
+from incremental import Manifeste, Selection, empreinte_generation
+from placeholders import index_placeholders
+from prototypes import prototype_ligne_table
+from fragments import bordures_tableau, remplacer_enfant
 
 
 def copy_row(table, row_idx):
@@ -66,19 +36,99 @@ def copy_row(table, row_idx):
     return table.rows[-1]
 
 
-def generer_convocation(data: dict, output_dir: str = None, template_path: str = "convocation template.docx"):
+# Version du rendu : à incrémenter quand la mise en forme produite change
+VERSION_GENERATEUR = 2
+
+
+def nom_fichier_convocation(apprenant):
+    """Nom du fichier : Convocation_NOM_Prenom.docx"""
+    nom_clean = apprenant.get("nom", "").replace(" ", "_")
+    prenom_clean = apprenant.get("prenom", "").replace(" ", "_")
+    return f"Convocation_{nom_clean}_{prenom_clean}.docx"
+
+
+def _generer_convocation_apprenant(contexte, apprenant):
+    """Génère la convocation d'un apprenant et retourne le chemin du fichier."""
+    nom = apprenant["nom"]
+    prenom = apprenant["prenom"]
+    lien_ressources = contexte["lien_ressources"]
+    
+    # Copie du template (parsé une seule fois par processus)
+    template_path = contexte["template_path"]
+    doc = charger_template(template_path)
+    index = index_placeholders(template_path)
+    
+    # Remplacements de base + données de l'apprenant
+    replacements = dict(contexte["replacements"])
+    replacements["{{PRENOM}}"] = prenom
+    replacements["{{NOM}}"] = nom
+    
+    # Remplacements aux emplacements repérés dans le template
+    index.remplir(doc, replacements)
+    
+    # Lien ressources (optionnel) : vider le paragraphe s'il n'y a pas de lien
+    if not lien_ressources:
+        for para in index.paragraphes(doc, "{{LIEN_RESSOURCES}}"):
+            para.clear()
+    
+    # Générer le tableau 1 (planning) dynamiquement
+    if len(doc.tables) > 1 and contexte["planning"]:
+        with phase("tableaux"):
+            table = doc.tables[1]
+            
+            # Supprimer les lignes de données existantes (garder l'en-tête ligne 0)
+            while len(table.rows) > 1:
+                tr = table.rows[-1]._tr
+                table._tbl.remove(tr)
+            
+            # Définir les largeurs des colonnes (Date: 5cm, Heure: 6cm, Lieu: 5cm)
+            table.columns[0].width = Cm(5)
+            table.columns[1].width = Cm(6)
+            table.columns[2].width = Cm(5)
+            
+            # Récupérer le style de l'en-tête pour l'appliquer aux nouvelles lignes
+            header_row = table.rows[0]
+            
+            # Ajouter une ligne par session (copies d'une ligne prototype Calibri 11pt)
+            prototype = prototype_ligne_table(table)
+            table._tbl.extend(prototype.creer(*ligne) for ligne in contexte["planning"])
+            compter("lignes", len(contexte["planning"]))
+            
+            # Appliquer les bordures au tableau (remplace les bordures du template)
+            remplacer_enfant(table._tbl.tblPr, bordures_tableau(size="4"))
+    
+    # Supprimer les paragraphes liés au lien ressources si pas de lien
+    if not lien_ressources:
+        paragraphs_to_clear = [
+            "Vous pourrez vous connecter à cette page",
+            "Vous trouverez sur cette page des détails"
+        ]
+        for para in doc.paragraphs:
+            for check in paragraphs_to_clear:
+                if check in para.text:
+                    para.clear()
+    
+    output_path = os.path.join(contexte["dossier_sortie"], nom_fichier_convocation(apprenant))
+    
+    enregistrer_docx(doc, contexte["template_path"], output_path)
+    return output_path
+
+
+def generer_convocation(data: dict, output_dir: str = None, template_path: str = "convocation template.docx",
+                        workers: int = 1, force: bool = False, convertisseur=None):
     """
     Génère une convocation par apprenant.
+    workers : nombre de processus de rendu (1 = séquentiel, 0 = un par cœur).
+    force : régénérer même les convocations dont les entrées n'ont pas changé.
+    convertisseur : ConvertisseurPDF auquel soumettre chaque convocation (optionnel).
+    Retourne la liste des convocations (régénérées ou inchangées), dans l'ordre des apprenants.
     """
     
+    # Vérifier toutes les données avant le rendu (toutes les erreurs en une fois)
+    valider(data, "convocation")
+    
     # Trouver le template
-    template = Path(template_path)
-    if not template.exists():
-        script_dir = Path(__file__).parent
-        template = script_dir.parent / "templates" / template_path
-        if not template.exists():
-            raise FileNotFoundError(f"Template non trouvé: {template_path}")
-    template_path = str(template)
+    template_path = trouver_template(template_path)
     
     # Parser les dates
     date_debut = parse_date(data["date_debut"])
@@ -112,188 +162,107 @@ def generer_convocation(data: dict, output_dir: str = None, template_path: str =
     print(f"   Durée : {data['duree_heures']} heures ({data['duree_jours']} jours)")
     print(f"   Lieu : {lieu_general}")
     print(f"   Sessions : {len(sessions)}")
-    print(f"   {len(data['apprenants'])} apprenant(s)")
-    
-    fichiers_generes = []
+    if hasattr(data["apprenants"], "__len__"):
+        print(f"   {len(data['apprenants'])} apprenant(s)")
+    else:
+        print("   Apprenants lus au fil du fichier")
     
-    for apprenant in data["apprenants"]:
-        nom = apprenant["nom"]
-        prenom = apprenant["prenom"]
-        
-        # Charger le template
-        doc = Document(template_path)
-        
-        # Préparer les remplacements de base
-        replacements = {
-            "{{DATE_EMISSION}}": format_date_fr(date_emission),
-            "{{PRENOM}}": prenom,
-            "{{NOM}}": nom,
-            "{{NOM_FORMATION}}": data["nom_formation"],
-            "{{LIEU}}": lieu_general,
-            "{{DATE_DEBUT}}": format_date_fr(date_debut),
-            "{{DATE_FIN}}": format_date_fr(date_fin),
-            "{{DUREE_HEURES}}": str(data["duree_heures"]),
-            "{{DUREE_JOURS}}": str(data["duree_jours"]),
-            "{{FORMATEUR}}": formateur_str,
-        }
-        
-        # Remplacements dans les paragraphes
-        for para in doc.paragraphs:
-            # Traitement spécial pour le paragraphe Lieu/Dates/Durée
-            if "{{LIEU}}" in para.text and "{{DATE_DEBUT}}" in para.text:
-                para.clear()
-                # Lieu
-                para.add_run("Lieu de la formation : ").font.name = "Calibri"
-                run_lieu = para.add_run(f"{lieu_general}.")
-                run_lieu.font.name = "Calibri"
-                run_lieu.font.bold = True
-                # Dates
-                para.add_run("\nDates de la formation : du ").font.name = "Calibri"
-                run_dates = para.add_run(f"{format_date_fr(date_debut)} au {format_date_fr(date_fin)}.")
-                run_dates.font.name = "Calibri"
-                run_dates.font.bold = True
-                # Durée
-                para.add_run("\nDurée de la formation : ").font.name = "Calibri"
-                run_duree = para.add_run(f"{data['duree_heures']} heures ({data['duree_jours']} jours).")
-                run_duree.font.name = "Calibri"
-                run_duree.font.bold = True
-                continue
-            
-            # Traitement spécial pour le formateur
-            if "{{FORMATEUR}}" in para.text:
-                para.clear()
-                para.add_run("Formateur(trice) : ").font.name = "Calibri"
-                run_formateur = para.add_run(formateur_str)
-                run_formateur.font.name = "Calibri"
-                run_formateur.font.bold = True
-                continue
-            
-            # Autres remplacements standards
-            for old, new in replacements.items():
-                replace_in_paragraph(para, old, new)
+    # Lignes du planning (Date, Heure, Lieu), communes à toutes les convocations,
+    # par jour (chaque date n'est lue et formatée qu'une fois)
+    planning = []
+    for jour, sessions_du_jour in grouper_sessions(sessions):
+        date_str = format_date_fr(jour)
+        for session in sessions_du_jour:
+            # Construire l'heure avec le type de session
+            heure_str = f"{session['debut']} - {session['fin']}"
+            if session.get("type"):
+                heure_str += f" ({session['type']})"
             
-            # Gérer le lien ressources (optionnel)
-            if "{{LIEN_RESSOURCES}}" in para.text:
-                if lien_ressources:
-                    replace_in_paragraph(para, "{{LIEN_RESSOURCES}}", lien_ressources)
-                else:
-                    para.clear()
-        
-        # Remplacements dans le tableau 0 (nom de formation) - en gras
-        if len(doc.tables) > 0:
-            for row in doc.tables[0].rows:
-                for cell in row.cells:
-                    for para in cell.paragraphs:
-                        if "{{NOM_FORMATION}}" in para.text:
-                            para.clear()
-                            run = para.add_run(data["nom_formation"])
-                            run.font.name = "Calibri"
-                            run.font.bold = True
-        
-        # Générer le tableau 1 (planning) dynamiquement
-        if len(doc.tables) > 1 and sessions:
-            table = doc.tables[1]
-            
-            # Supprimer les lignes de données existantes (garder l'en-tête ligne 0)
-            while len(table.rows) > 1:
-                tr = table.rows[-1]._tr
-                table._tbl.remove(tr)
-            
-            # Définir les largeurs des colonnes (Date: 5cm, Heure: 6cm, Lieu: 5cm)
-            table.columns[0].width = Cm(5)
-            table.columns[1].width = Cm(6)
-            table.columns[2].width = Cm(5)
-            
-            # Récupérer le style de l'en-tête pour l'appliquer aux nouvelles lignes
-            header_row = table.rows[0]
-            
-            # Ajouter une ligne par session
-            for session in sessions:
-                # Parser la date de la session
-                session_date = parse_date(session["date"])
-                date_str = format_date_fr(session_date)
-                
-                # Construire l'heure avec le type de session
-                heure_str = f"{session['debut']} - {session['fin']}"
-                if session.get("type"):
-                    heure_str += f" ({session['type']})"
-                
-                # Lieu de la session ou lieu général
-                lieu_str = session.get("lieu", lieu_general)
-                
-                # Ajouter une nouvelle ligne
-                new_row = table.add_row()
-                
-                # Remplir les cellules avec le bon formatage
-                for i, text in enumerate([date_str, heure_str, lieu_str]):
-                    cell = new_row.cells[i]
-                    cell.text = ""
-                    para = cell.paragraphs[0]
-                    run = para.add_run(text)
-                    # Appliquer la police Calibri 11pt
-                    run.font.name = "Calibri"
-                    run.font.size = Pt(11)
-            
-            # Appliquer les bordures au tableau
-            tbl = table._tbl
-            tbl_pr = tbl.tblPr if tbl.tblPr is not None else parse_xml(r'<w:tblPr xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"/>')
-            tbl_borders = parse_xml(
-                r'<w:tblBorders xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
-                r'<w:top w:val="single" w:sz="4" w:space="0" w:color="000000"/>'
-                r'<w:left w:val="single" w:sz="4" w:space="0" w:color="000000"/>'
-                r'<w:bottom w:val="single" w:sz="4" w:space="0" w:color="000000"/>'
-                r'<w:right w:val="single" w:sz="4" w:space="0" w:color="000000"/>'
-                r'<w:insideH w:val="single" w:sz="4" w:space="0" w:color="000000"/>'
-                r'<w:insideV w:val="single" w:sz="4" w:space="0" w:color="000000"/>'
-                r'</w:tblBorders>'
-            )
-            tbl_pr.append(tbl_borders)
-            if tbl.tblPr is None:
-                tbl.insert(0, tbl_pr)
-        
-        # Supprimer les paragraphes liés au lien ressources si pas de lien
-        if not lien_ressources:
-            paragraphs_to_clear = [
-                "Vous pourrez vous connecter à cette page",
-                "Vous trouverez sur cette page des détails"
-            ]
-            for para in doc.paragraphs:
-                for check in paragraphs_to_clear:
-                    if check in para.text:
-                        para.clear()
-        
-        # Nom du fichier
-        nom_clean = nom.replace(" ", "_")
-        prenom_clean = prenom.replace(" ", "_")
-        filename = f"Convocation_{nom_clean}_{prenom_clean}.docx"
-        
-        # Chemin de sortie
-        if output_dir:
-            output_path = os.path.join(output_dir, filename)
-        elif "_source_dir" in data and data["_source_dir"]:
-            output_path = os.path.join(data["_source_dir"], filename)
-        else:
-            output_path = filename
-        
-        doc.save(output_path)
-        fichiers_generes.append(output_path)
-        print(f"   ✅ {filename}")
+            # Lieu de la session ou lieu général
+            lieu_str = session.get("lieu", lieu_general)
+            planning.append((date_str, heure_str, lieu_str))
+    
+    # Préparer les remplacements de base
+    replacements = {
+        "{{DATE_EMISSION}}": format_date_fr(date_emission),
+        "{{NOM_FORMATION}}": data["nom_formation"],
+        "{{LIEU}}": lieu_general,
+        "{{DATE_DEBUT}}": format_date_fr(date_debut),
+        "{{DATE_FIN}}": format_date_fr(date_fin),
+        "{{DUREE_HEURES}}": str(data["duree_heures"]),
+        "{{DUREE_JOURS}}": str(data["duree_jours"]),
+        "{{FORMATEUR}}": formateur_str,
+    }
+    if lien_ressources:
+        replacements["{{LIEN_RESSOURCES}}"] = lien_ressources
+    
+    # Valeurs communes à toutes les convocations (envoyées à chaque worker)
+    contexte = {
+        "template_path": template_path,
+        "replacements": replacements,
+        "lien_ressources": lien_ressources,
+        "planning": planning,
+        # Dossier de sortie : output_dir, sinon dossier client, sinon dossier courant
+        "dossier_sortie": output_dir or data.get("_source_dir") or "",
+    }
+    
+    # Empreinte des entrées de chaque convocation : seules celles qui ont changé sont régénérées
+    dossier_sortie = contexte["dossier_sortie"]
+    manifeste = Manifeste(dossier_sortie)
+    valeurs = {k: v for k, v in contexte.items() if k not in ("template_path", "dossier_sortie")}
+    def cible(apprenant):
+        output_path = os.path.join(dossier_sortie, nom_fichier_convocation(apprenant))
+        return output_path, empreinte_generation(VERSION_GENERATEUR, template_path, valeurs,
+                                                 apprenant.get("nom"), apprenant.get("prenom"))
     
-    print(f"\n🎉 {len(fichiers_generes)} convocation(s) générée(s)")
-    return fichiers_generes
+    # Conversion PDF au fil de la génération (documents régénérés ou déjà à jour)
+    au_fichier = convertisseur.soumettre if convertisseur is not None else None
+    selection = Selection(manifeste, cible, force, au_inchange=au_fichier)
+    
+    # Les apprenants (liste ou flux) sont examinés et générés au fur et à mesure de la lecture
+    fichiers_generes, erreurs = executer_par_apprenant(
+        _generer_convocation_apprenant, contexte, selection.filtrer(data["apprenants"]), workers, au_fichier
+    )
+    selection.enregistrer(fichiers_generes)
+    
+    print(f"\n🎉 {len(fichiers_generes)} convocation(s) générée(s), {len(selection.inchanges)} inchangée(s)")
+    if erreurs:
+        print(f"⚠️  {len(erreurs)} convocation(s) en erreur")
+        # Les documents réussis sont conservés (et enregistrés dans le manifeste)
+        raise EchecsApprenants("convocation", selection.resultats(fichiers_generes), echecs(erreurs))
+    return selection.resultats(fichiers_generes)
 
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        json_path = sys.argv[1]
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        source_dir = os.path.dirname(os.path.abspath(json_path))
-        if os.path.basename(source_dir) == "data":
-            source_dir = os.path.dirname(source_dir)
-        if source_dir and source_dir != os.getcwd():
-            data["_source_dir"] = source_dir
-        generer_convocation(data)
+    parser = argparse.ArgumentParser(description="Génère une convocation par apprenant.")
+    parser.add_argument("json_path", nargs="?", help="Fichier JSON de la formation")
+    parser.add_argument("--apprenants", metavar="FICHIER",
+                        help="Liste des apprenants en CSV ou JSONL, lue au fil de la génération (remplace celle du JSON)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Nombre de processus de rendu (défaut: 1, 0 = un par cœur)")
+    options_communes(parser, "les convocations")
+    args = parser.parse_args()
+    
+    if args.json_path:
+        # Les fichiers sont générés dans le dossier client
+        data = charger_json(args.json_path)
+        if args.apprenants:
+            try:
+                data["apprenants"] = lire_apprenants(args.apprenants, "convocation")
+            except OSError as e:
+                parser.error(f"--apprenants : {e}")
+        verifier_ou_quitter(data, "convocation", seulement=args.verifier)
+        convertisseur = convertisseur_ou_quitter(parser, args)
+        try:
+            with profiler(sorties(args.profile, args.profile_jsonl), "convocation"), \
+                    (convertisseur or contextlib.nullcontext()):
+                generer_convocation(data, workers=args.workers, force=args.force, convertisseur=convertisseur)
+        except EchecsApprenants:
+            # Chaque échec a déjà été affiché
+            sys.exit(1)
+        except SchemaInvalide as e:
+            # Ligne invalide dans le fichier --apprenants (lu au fil de la génération)
+            quitter_invalide(e)
     else:
         print("Usage: python3 generer_convocation.py <fichier.json>")
         print("\nExemple de structure JSON:")
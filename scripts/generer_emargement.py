@@ -5,54 +5,34 @@ Générateur de feuilles d'émargement pour formations MINDNESS
 Utilise le template EMARGEMENT TEMPLATE.docx comme base.
 """
 
-import json
-import sys
+import argparse
+import contextlib
 import os
 import copy
-from datetime import datetime, timedelta
-from pathlib import Path
-from collections import defaultdict
-from docx import Document
-from docx.shared import Pt
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-
-
-def format_date_fr(date_obj):
-    """Formate une date en français (ex: lundi 16 décembre 2024)."""
-    mois = [
-        "", "janvier", "février", "mars", "avril", "mai", "juin",
-        "juillet", "août", "septembre", "octobre", "novembre", "décembre"
-    ]
-    jours = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
-    return f"{jours[date_obj.weekday()]} {date_obj.day} {mois[date_obj.month]} {date_obj.year}"
-
-
-def format_date_short(date_obj):
-    """Formate une date en format court (ex: 16/12/2024)."""
-    return date_obj.strftime("%d/%m/%Y")
-
+from functools import lru_cache, partial
+from commun import OxmlElement, Paragraph, Table, parse_xml, qn, charger_json, quitter_invalide, trouver_template, verifier_ou_quitter, convertisseur_ou_quitter, options_communes
+from dates import format_date_jour, format_date_short, grouper_sessions, jours_ouvres, parse_date
+from template_cache import charger_template, charger_template_parse
+from ecriture_docx import enregistrer_docx, enregistrer_docx_flux
+from prototypes import MARQUEUR, PrototypeLigne
+from placeholders import Marqueurs
+from mesures import actives, compter, fusionner, mesurer, phase, profiler, sorties
+from parallele import nombre_workers
+from progression import point_annulation, signaler
+from apprenants import lire_apprenants
+from schema import SchemaInvalide, valider
+from incremental import Manifeste, empreinte_generation
+from fragments import GRIS, bordures_cellule, bordures_tableau, cloner, fond, remplacer_enfant, rpr_calibri
 
-def parse_date(date_str):
-    """Parse une date en différents formats."""
-    formats = ["%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%y"]
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str, fmt)
-        except ValueError:
-            continue
-    raise ValueError(f"Format de date non reconnu: {date_str}")
 
+# Version du rendu : à incrémenter quand la mise en forme produite change
+VERSION_GENERATEUR = 1
 
-def generate_date_range(date_debut, date_fin):
-    """Génère la liste des jours ouvrés entre deux dates."""
-    dates = []
-    current = date_debut
-    while current <= date_fin:
-        if current.weekday() < 5:
-            dates.append(current)
-        current += timedelta(days=1)
-    return dates
+# Marqueurs du tableau d'informations du template, remplacés en une seule passe
+MARQUEURS = Marqueurs([
+    "XXXXX", "PRESENTIELOUDISTANCIEL, LIEU", "NOMBREHEURES", "DATE",
+    "M. ALBOUZE Alexis", "ALBOUZE Alexis",
+])
 
 
 def copy_element(element):
@@ -60,140 +40,279 @@ def copy_element(element):
     return copy.deepcopy(element)
 
 
-def set_cell_shading(cell, color="D3D3D3"):
-    """Applique un fond gris à une cellule."""
-    shading = OxmlElement('w:shd')
-    shading.set(qn('w:fill'), color)
-    shading.set(qn('w:val'), 'clear')
-    cell._tc.get_or_add_tcPr().append(shading)
+def texte_element(element):
+    """Texte brut d'un élément XML (concaténation des w:t)."""
+    return "".join(t.text or "" for t in element.iter(qn('w:t')))
+
+
+def set_cell_shading(cell, color=GRIS):
+    """Applique un fond gris à une cellule (remplace un fond existant)."""
+    remplacer_enfant(cell._tc.get_or_add_tcPr(), fond(color))
 
 
 def set_cell_borders(cell, color="000000", size="6"):
-    """Applique des bordures à une cellule."""
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    tcBorders = OxmlElement('w:tcBorders')
-    for border_name in ['top', 'left', 'bottom', 'right']:
-        border = OxmlElement(f'w:{border_name}')
-        border.set(qn('w:val'), 'single')
-        border.set(qn('w:sz'), size)
-        border.set(qn('w:color'), color)
-        border.set(qn('w:space'), '0')
-        tcBorders.append(border)
-    tcPr.append(tcBorders)
+    """Applique des bordures à une cellule (remplace les bordures existantes)."""
+    remplacer_enfant(cell._tc.get_or_add_tcPr(), bordures_cellule(color, size))
+
+
+def creer_run(texte, gras=False):
+    """Crée un run Calibri 9pt (w:r) contenant `texte`."""
+    r = OxmlElement('w:r')
+    r.append(cloner(rpr_calibri(18, gras)))
+    t = OxmlElement('w:t')
+    t.text = texte
+    if texte != texte.strip():
+        t.set(qn('xml:space'), 'preserve')
+    r.append(t)
+    return r
+
+
+def creer_cellule(largeur, texte=None, gras=False, colonnes=1, couleur_fond=None):
+    """Crée une cellule (w:tc) bordée, éventuellement fusionnée sur `colonnes` et grisée."""
+    tc = OxmlElement('w:tc')
+    tcPr = OxmlElement('w:tcPr')
+    tcW = OxmlElement('w:tcW')
+    tcW.set(qn('w:type'), 'dxa')
+    tcW.set(qn('w:w'), str(largeur))
+    tcPr.append(tcW)
+    if colonnes > 1:
+        gridSpan = OxmlElement('w:gridSpan')
+        gridSpan.set(qn('w:val'), str(colonnes))
+        tcPr.append(gridSpan)
+    tcPr.append(cloner(bordures_cellule()))
+    if couleur_fond:
+        tcPr.append(cloner(fond(couleur_fond)))
+    tc.append(tcPr)
+    p = OxmlElement('w:p')
+    if texte is not None:
+        p.append(creer_run(texte, gras))
+    tc.append(p)
+    return tc
+
+
+def creer_ligne_titre(largeurs, texte):
+    """Crée une ligne fusionnée sur toute la largeur, fond gris, texte en gras."""
+    tr = OxmlElement('w:tr')
+    tr.append(creer_cellule(sum(largeurs), texte, gras=True, colonnes=len(largeurs), couleur_fond=GRIS))
+    return tr
+
+
+def creer_ligne_signature(largeurs, texte):
+    """Crée une ligne nom + case de signature (hauteur minimale 500)."""
+    tr = OxmlElement('w:tr')
+    trPr = OxmlElement('w:trPr')
+    trHeight = OxmlElement('w:trHeight')
+    trHeight.set(qn('w:val'), "500")
+    trHeight.set(qn('w:hRule'), "atLeast")
+    trPr.append(trHeight)
+    tr.append(trPr)
+    tr.append(creer_cellule(largeurs[0], texte))
+    for largeur in largeurs[1:]:
+        tr.append(creer_cellule(largeur))
+    return tr
 
 
 def set_table_borders(table):
-    """Applique des bordures à tout le tableau."""
-    tbl = table._tbl
-    tblPr = tbl.tblPr if tbl.tblPr is not None else OxmlElement('w:tblPr')
+    """Applique des bordures à tout le tableau (remplace les bordures existantes)."""
+    remplacer_enfant(table._tbl.tblPr, bordures_tableau())
+
+
+def elements_template(template_path):
+    """
+    Éléments du corps du template recopiés sur chaque page (sans le sectPr ni les
+    paragraphes vides), lus dans le template parsé partagé (à copier avant modification).
+    """
+    body = charger_template_parse(template_path).element.body
+    return [
+        elem for elem in body
+        if elem.tag != qn('w:sectPr') and (elem.tag != qn('w:p') or texte_element(elem).strip())
+    ]
+
+
+@lru_cache(maxsize=None)
+def prototypes_lignes(largeurs):
+    """Prototypes des lignes titre et signature pour une grille (construits une fois par processus)."""
+    return (
+        PrototypeLigne(creer_ligne_titre(largeurs, MARQUEUR)),
+        PrototypeLigne(creer_ligne_signature(largeurs, MARQUEUR)),
+    )
+
+
+def construire_page(contexte, page_idx, jour, sessions):
+    """
+    Construit la page d'un jour : copie des éléments du template, tableau d'informations,
+    tableau d'émargement et paragraphe "Fait à".
+    Une page ne dépend que de son jour : les pages peuvent être construites séparément.
     
-    tblBorders = OxmlElement('w:tblBorders')
-    for border_name in ['top', 'left', 'bottom', 'right', 'insideH', 'insideV']:
-        border = OxmlElement(f'w:{border_name}')
-        border.set(qn('w:val'), 'single')
-        border.set(qn('w:sz'), '6')
-        border.set(qn('w:color'), '000000')
-        border.set(qn('w:space'), '0')
-        tblBorders.append(border)
+    Returns:
+        Liste des éléments de la page, à ajouter au corps du document
+    """
+    page_elements = [copy_element(elem) for elem in elements_template(contexte["template_path"])]
     
-    # Supprimer anciennes bordures si elles existent
-    for child in list(tblPr):
-        if child.tag.endswith('tblBorders'):
-            tblPr.remove(child)
+    # Pas de saut de page hérité du template ; pageBreakBefore pour les pages suivantes
+    for elem in page_elements:
+        pPr = elem.find(qn('w:pPr')) if elem.tag == qn('w:p') else None
+        if pPr is not None:
+            pb = pPr.find(qn('w:pageBreakBefore'))
+            if pb is not None:
+                pPr.remove(pb)
+    if page_idx > 0:
+        pPr = page_elements[0].find(qn('w:pPr'))
+        if pPr is None:
+            pPr = OxmlElement('w:pPr')
+            page_elements[0].insert(0, pPr)
+        pageBreakBefore = OxmlElement('w:pageBreakBefore')
+        pageBreakBefore.set(qn('w:val'), '1')
+        pPr.append(pageBreakBefore)
+    page_elements[1:1] = [OxmlElement('w:p'), OxmlElement('w:p')]
     
-    tblPr.append(tblBorders)
+    tables = [Table(elem, None) for elem in page_elements if elem.tag == qn('w:tbl')]
+    paragraphes_fait = [
+        Paragraph(elem, None) for elem in page_elements
+        if elem.tag == qn('w:p') and "Fait" in texte_element(elem) and "xx" in texte_element(elem)
+    ]
     
-    if tbl.tblPr is None:
-        tbl.insert(0, tblPr)
+    if len(tables) >= 2:
+        table_info, table_emarg = tables[:2]
+        intervenants_jour = contexte["intervenants_par_jour"].get(jour.strftime("%Y-%m-%d"), contexte["formateurs"])
+        
+        # TABLEAU 1 : INFOS FORMATION
+        # Marqueurs en une seule passe ; DATE : début puis fin, dans l'ordre d'apparition
+        MARQUEURS.remplir(table_info._tbl, {
+            "XXXXX": contexte["nom_formation"],
+            "PRESENTIELOUDISTANCIEL, LIEU": contexte["lieu"],
+            "NOMBREHEURES": contexte["duree_heures"],
+            "DATE": (contexte["date_debut"], contexte["date_fin"]),
+            "M. ALBOUZE Alexis": contexte["formateurs"][0],
+            "ALBOUZE Alexis": contexte["formateurs"][0],
+        })
+        
+        # TABLEAU 2 : ÉMARGEMENT - Reconstruire complètement
+        with phase("tableaux"):
+            # Appliquer les bordures au tableau
+            set_table_borders(table_emarg)
+            
+            # Ligne 0 : Date du jour
+            for cell in table_emarg.rows[0].cells:
+                set_cell_borders(cell)
+                for para in cell.paragraphs:
+                    para.clear()
+                    para._p.append(creer_run(f"Date : {format_date_jour(jour)}", gras=True))
+            
+            # Supprimer d'un bloc toutes les lignes sauf la première (en-tête date)
+            tbl = table_emarg._tbl
+            for tr in tbl.tr_lst[1:]:
+                tbl.remove(tr)
+            
+            # Prototypes de lignes (toutes les pages ont la même grille)
+            largeurs = tuple(int(gridCol.get(qn('w:w'))) for gridCol in tbl.tblGrid.gridCol_lst)
+            proto_titre, proto_signature = prototypes_lignes(largeurs)
+            
+            # Construire toutes les lignes (copies des prototypes) puis les ajouter en une fois
+            lignes = []
+            for session in sessions:
+                # Ligne créneau (fusionnée, fond gris)
+                lignes.append(proto_titre.creer(f"Créneau : {session['horaires']} ({session['type']})"))
+                
+                # Lignes apprenants
+                lignes.extend(proto_signature.creer(texte) for texte in contexte["textes_apprenants"])
+                
+                # Ligne "Formateur" (fond gris)
+                lignes.append(proto_titre.creer("Formateur"))
+                
+                # Lignes intervenants
+                lignes.extend(proto_signature.creer(intervenant) for intervenant in intervenants_jour)
+            tbl.extend(lignes)
+            compter("lignes", len(lignes))
+    
+    # Remplacer "Fait à"
+    for para in paragraphes_fait:
+        para.clear()
+        para._p.append(creer_run(f"Fait à {contexte['ville_signature']}, le {format_date_short(jour)}"))
+    
+    return page_elements
+
 
+def _page_serialisee(contexte, mesure, page):
+    """
+    Dans un worker : construit une page et la retourne sérialisée (un fragment OOXML
+    par élément), avec les mesures prises si elles sont demandées.
+    """
+    from lxml import etree
+    page_idx, (jour, sessions) = page
+    with (mesurer() if mesure else contextlib.nullcontext()) as mesures:
+        fragments = [etree.tostring(elem) for elem in construire_page(contexte, page_idx, jour, sessions)]
+    return fragments, mesures.releve() if mesure else None
+
+
+def _pages(contexte, pages_to_generate, workers=1):
+    """
+    Produit les éléments de chaque page, dans l'ordre des jours.
+    Avec plusieurs workers, les pages sont construites en parallèle puis relues
+    (fragments OOXML) au fur et à mesure, toujours dans l'ordre des jours.
+    """
+    workers = min(nombre_workers(workers), max(len(pages_to_generate), 1))
+    if workers == 1:
+        for page_idx, (jour, sessions) in enumerate(pages_to_generate):
+            yield construire_page(contexte, page_idx, jour, sessions)
+        return
+    
+    # Importé ici : le mode séquentiel n'en paie pas le coût
+    from concurrent.futures import ProcessPoolExecutor
+    mesure = actives()
+    tache = partial(_page_serialisee, contexte, mesure)
+    # Quelques lots par worker : la charge reste équilibrée sans multiplier les envois
+    lot = max(1, len(pages_to_generate) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for fragments, releve in executor.map(tache, enumerate(pages_to_generate), chunksize=lot):
+            if mesure:
+                fusionner(releve)
+            yield [parse_xml(fragment) for fragment in fragments]
 
-def generer_emargement(data: dict, output_path: str = None, template_path: str = "EMARGEMENT TEMPLATE.docx"):
+
+def generer_emargement(data: dict, output_path: str = None, template_path: str = "EMARGEMENT TEMPLATE.docx",
+                       force: bool = False, convertisseur=None, workers: int = 1, flux: bool = False):
     """
     Génère une feuille d'émargement complète.
     Regroupe les sessions du même jour sur une seule page.
+    force : régénérer même si les entrées n'ont pas changé.
+    convertisseur : ConvertisseurPDF auquel soumettre la feuille (optionnel).
+    workers : nombre de processus qui construisent les pages (1 = séquentiel, 0 = un par cœur).
+    flux : écrire les pages dans le fichier au fur et à mesure (mémoire constante).
     """
     
+    # Vérifier toutes les données avant le rendu (toutes les erreurs en une fois)
+    valider(data, "emargement")
+    
     # Trouver le template
-    template = Path(template_path)
-    if not template.exists():
-        # Chercher dans le dossier templates/ (à côté du dossier scripts/)
-        script_dir = Path(__file__).parent
-        template = script_dir.parent / "templates" / template_path
-        if not template.exists():
-            raise FileNotFoundError(f"Template non trouvé: {template_path}")
-    template_path = str(template)
+    template_path = trouver_template(template_path)
     
     date_debut = parse_date(data["date_debut"])
     date_fin = parse_date(data["date_fin"])
     
     print(f"📅 Formation du {format_date_short(date_debut)} au {format_date_short(date_fin)}")
     
-    # Charger le template
-    doc = Document(template_path)
-    
     # Préparer les valeurs communes
     date_debut_str = format_date_short(date_debut)
     date_fin_str = format_date_short(date_fin)
     ville_signature = data.get("ville_signature", "Paris")
     formateurs_list = data["formateurs"]
     
-    # Collecter les éléments du template
-    body = doc.element.body
-    template_elements = []
-    sectPr = None
-    
-    for elem in list(body):
-        tag = elem.tag.split('}')[-1]
-        
-        if tag == 'sectPr':
-            sectPr = elem
-            continue
-        
-        if tag == 'p':
-            has_text = False
-            for t in elem.iter(qn('w:t')):
-                if t.text and t.text.strip():
-                    has_text = True
-                    break
-            if not has_text:
-                all_text = "".join(t.text or "" for t in elem.iter(qn('w:t')))
-                if not all_text.strip():
-                    continue
-        
-        if tag == 'p':
-            pPr = elem.find(qn('w:pPr'))
-            if pPr is not None:
-                pb = pPr.find(qn('w:pageBreakBefore'))
-                if pb is not None:
-                    pPr.remove(pb)
-        
-        template_elements.append(elem)
-    
-    # Vider le body
-    for elem in list(body):
-        if not elem.tag.endswith('sectPr'):
-            body.remove(elem)
-    
     # Regrouper les sessions par jour
     if "sessions" in data:
-        sessions_by_day = defaultdict(list)
-        for session in data["sessions"]:
-            session_date = parse_date(session["date"])
-            sessions_by_day[session_date].append({
+        pages_to_generate = [
+            (jour, [{
                 "type": session.get("type", ""),
                 "horaires": f"{session['debut']}-{session['fin']}",
                 "debut": session["debut"],
                 "fin": session["fin"]
-            })
-        
-        # Trier les jours
-        jours = sorted(sessions_by_day.keys())
-        pages_to_generate = [(jour, sessions_by_day[jour]) for jour in jours]
+            } for session in sessions_du_jour])
+            for jour, sessions_du_jour in grouper_sessions(data["sessions"])
+        ]
         print(f"📆 {len(pages_to_generate)} jour(s) de formation")
     else:
         # Format classique
-        jours_formation = generate_date_range(date_debut, date_fin)
+        jours_formation = jours_ouvres(date_debut, date_fin)
         horaires = data["horaires"]
         pages_to_generate = []
         for jour in jours_formation:
@@ -204,189 +323,7 @@ def generer_emargement(data: dict, output_path: str = None, template_path: str =
             pages_to_generate.append((jour, sessions))
         print(f"📆 {len(pages_to_generate)} jour(s) de formation")
     
-    # Générer les pages
-    for page_idx, (jour, sessions) in enumerate(pages_to_generate):
-        date_jour_str = format_date_fr(jour)
-        
-        sessions_str = ", ".join([f"{s['type']} {s['horaires']}" for s in sessions])
-        print(f"   → {date_jour_str} : {sessions_str}")
-        
-        # Copier les éléments du template
-        page_elements = [copy_element(elem) for elem in template_elements]
-        
-        # Ajouter pageBreakBefore pour les pages suivantes
-        for i, elem in enumerate(page_elements):
-            if page_idx > 0 and i == 0:
-                pPr = elem.find(qn('w:pPr'))
-                if pPr is None:
-                    pPr = OxmlElement('w:pPr')
-                    elem.insert(0, pPr)
-                pageBreakBefore = OxmlElement('w:pageBreakBefore')
-                pageBreakBefore.set(qn('w:val'), '1')
-                pPr.append(pageBreakBefore)
-            body.append(elem)
-            
-            if i == 0:
-                for _ in range(2):
-                    empty_p = OxmlElement('w:p')
-                    body.append(empty_p)
-    
-    if sectPr is not None:
-        body.append(sectPr)
-    
-    # Recharger le document
-    import io
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    doc = Document(buffer)
-    
-    # Remplacements dans chaque page
-    tables_per_page = 2
-    
-    for page_idx, (jour, sessions) in enumerate(pages_to_generate):
-        jour_str_key = jour.strftime("%Y-%m-%d")
-        intervenants_jour = data.get("intervenants_par_jour", {}).get(jour_str_key, data["formateurs"])
-        
-        date_jour_str = format_date_fr(jour)
-        date_signature = format_date_short(jour)
-        
-        table_info_idx = page_idx * tables_per_page
-        table_emarg_idx = page_idx * tables_per_page + 1
-        
-        if table_info_idx >= len(doc.tables) or table_emarg_idx >= len(doc.tables):
-            continue
-        
-        table_info = doc.tables[table_info_idx]
-        table_emarg = doc.tables[table_emarg_idx]
-        
-        # TABLEAU 1 : INFOS FORMATION
-        # Compter les occurrences de DATE pour savoir laquelle remplacer
-        date_count = [0]  # Utiliser une liste pour modifier dans la closure
-        
-        for row in table_info.rows:
-            for cell in row.cells:
-                for para in cell.paragraphs:
-                    for run in para.runs:
-                        text = run.text
-                        text = text.replace("XXXXX", data["nom_formation"])
-                        text = text.replace("PRESENTIELOUDISTANCIEL, LIEU", data["lieu"])
-                        text = text.replace("NOMBREHEURES", str(data["duree_heures"]))
-                        # Remplacer DATE selon l'ordre d'apparition
-                        while "DATE" in text:
-                            if date_count[0] == 0:
-                                text = text.replace("DATE", date_debut_str, 1)
-                            else:
-                                text = text.replace("DATE", date_fin_str, 1)
-                            date_count[0] += 1
-                        text = text.replace("M. ALBOUZE Alexis", formateurs_list[0])
-                        text = text.replace("ALBOUZE Alexis", formateurs_list[0])
-                        run.text = text
-        
-        # TABLEAU 2 : ÉMARGEMENT - Reconstruire complètement
-        # Appliquer les bordures au tableau
-        set_table_borders(table_emarg)
-        
-        # Ligne 0 : Date du jour
-        for cell in table_emarg.rows[0].cells:
-            set_cell_borders(cell)
-            for para in cell.paragraphs:
-                para.clear()
-                run = para.add_run(f"Date : {date_jour_str}")
-                run.font.name = 'Calibri'
-                run.font.size = Pt(9)
-                run.bold = True
-        
-        # Supprimer toutes les lignes existantes sauf la première (en-tête date)
-        while len(table_emarg.rows) > 1:
-            tr = table_emarg.rows[-1]._tr
-            table_emarg._tbl.remove(tr)
-        
-        # Ajouter les créneaux
-        for session in sessions:
-            # Ligne créneau (fusionnée, fond gris)
-            row_creneau = table_emarg.add_row()
-            cell_creneau = row_creneau.cells[0]
-            cell_creneau.merge(row_creneau.cells[1])
-            set_cell_shading(cell_creneau)
-            set_cell_borders(cell_creneau)
-            para = cell_creneau.paragraphs[0]
-            para.clear()
-            run = para.add_run(f"Créneau : {session['horaires']} ({session['type']})")
-            run.font.name = 'Calibri'
-            run.font.size = Pt(9)
-            run.bold = True
-            
-            # Lignes apprenants
-            for apprenant in data["apprenants"]:
-                row_app = table_emarg.add_row()
-                cell_nom = row_app.cells[0]
-                cell_sig = row_app.cells[1]
-                set_cell_borders(cell_nom)
-                set_cell_borders(cell_sig)
-                para = cell_nom.paragraphs[0]
-                para.clear()
-                run = para.add_run(f"{apprenant['nom']} {apprenant['prenom']}  ---  {apprenant['email']}")
-                run.font.name = 'Calibri'
-                run.font.size = Pt(9)
-                cell_sig.paragraphs[0].clear()
-                
-                tr = row_app._tr
-                trPr = tr.get_or_add_trPr()
-                trHeight = OxmlElement('w:trHeight')
-                trHeight.set(qn('w:val'), "500")
-                trHeight.set(qn('w:hRule'), "atLeast")
-                trPr.append(trHeight)
-            
-            # Ligne "Formateur" (fond gris)
-            row_form_label = table_emarg.add_row()
-            cell_form_label = row_form_label.cells[0]
-            cell_form_label.merge(row_form_label.cells[1])
-            set_cell_shading(cell_form_label)
-            set_cell_borders(cell_form_label)
-            para = cell_form_label.paragraphs[0]
-            para.clear()
-            run = para.add_run("Formateur")
-            run.font.name = 'Calibri'
-            run.font.size = Pt(9)
-            run.bold = True
-            
-            # Lignes intervenants
-            for intervenant in intervenants_jour:
-                row_int = table_emarg.add_row()
-                cell_nom = row_int.cells[0]
-                cell_sig = row_int.cells[1]
-                set_cell_borders(cell_nom)
-                set_cell_borders(cell_sig)
-                para = cell_nom.paragraphs[0]
-                para.clear()
-                run = para.add_run(intervenant)
-                run.font.name = 'Calibri'
-                run.font.size = Pt(9)
-                cell_sig.paragraphs[0].clear()
-                
-                tr = row_int._tr
-                trPr = tr.get_or_add_trPr()
-                trHeight = OxmlElement('w:trHeight')
-                trHeight.set(qn('w:val'), "500")
-                trHeight.set(qn('w:hRule'), "atLeast")
-                trPr.append(trHeight)
-    
-    # Remplacer "Fait à"
-    page_idx = 0
-    for para in doc.paragraphs:
-        text = para.text
-        if "Fait" in text and "xx" in text:
-            if page_idx < len(pages_to_generate):
-                jour, _ = pages_to_generate[page_idx]
-                date_sig = format_date_short(jour)
-                para.clear()
-                run = para.add_run(f"Fait à {ville_signature}, le {date_sig}")
-                run.font.name = 'Calibri'
-                run.font.size = Pt(9)
-                page_idx += 1
-    
-    # Sauvegarde (dans le même dossier que le fichier JSON source si spécifié)
+    # Chemin de sortie (dans le même dossier que le fichier JSON source si spécifié)
     if output_path is None:
         nom_clean = "".join(c if c.isalnum() or c in " -_" else "" for c in data["nom_formation"])
         nom_clean = nom_clean.replace(" ", "_")[:50]
@@ -398,24 +335,110 @@ def generer_emargement(data: dict, output_path: str = None, template_path: str =
         else:
             output_path = filename
     
-    doc.save(output_path)
-    print(f"✅ Feuille d'émargement générée : {output_path}")
+    # Textes des lignes apprenants, identiques sur toutes les pages
+    # (la liste ou le flux d'apprenants est lu une seule fois)
+    textes_apprenants = [
+        f"{apprenant['nom']} {apprenant['prenom']}  ---  {apprenant['email']}"
+        for apprenant in data["apprenants"]
+    ]
+    
+    # Rien à faire si la feuille existe déjà pour les mêmes entrées
+    manifeste = Manifeste(os.path.dirname(output_path))
+    empreinte_entrees = empreinte_generation(
+        VERSION_GENERATEUR, template_path, pages_to_generate, textes_apprenants,
+        formateurs_list, data.get("intervenants_par_jour", {}), data["nom_formation"],
+        data["lieu"], data["duree_heures"], date_debut_str, date_fin_str, ville_signature
+    )
+    if not force and manifeste.a_jour(output_path, empreinte_entrees):
+        signaler("inchange", f"⏭️  Feuille d'émargement inchangée : {output_path}", chemin=output_path)
+        if convertisseur is not None:
+            convertisseur.soumettre(output_path)
+        return output_path
+    
+    # Valeurs communes à toutes les pages (envoyées à chaque worker)
+    contexte = {
+        "template_path": template_path,
+        "nom_formation": data["nom_formation"],
+        "lieu": data["lieu"],
+        "duree_heures": str(data["duree_heures"]),
+        "date_debut": date_debut_str,
+        "date_fin": date_fin_str,
+        "formateurs": formateurs_list,
+        "intervenants_par_jour": data.get("intervenants_par_jour", {}),
+        "textes_apprenants": textes_apprenants,
+        "ville_signature": ville_signature,
+    }
+    
+    # Copie du template (parsé une seule fois par processus), vidée sauf son sectPr
+    doc = charger_template(template_path)
+    body = doc.element.body
+    sectPr = None
+    for elem in list(body):
+        if elem.tag == qn('w:sectPr'):
+            sectPr = elem
+        else:
+            body.remove(elem)
+    
+    def elements_pages():
+        # Pages construites une à une ou par des workers, dans l'ordre des jours
+        for (jour, sessions), page_elements in zip(pages_to_generate, _pages(contexte, pages_to_generate, workers)):
+            point_annulation()
+            sessions_str = ", ".join([f"{s['type']} {s['horaires']}" for s in sessions])
+            print(f"   → {format_date_jour(jour)} : {sessions_str}")
+            yield from page_elements
+    
+    if flux:
+        # Chaque page est écrite dans le fichier puis oubliée
+        enregistrer_docx_flux(doc, template_path, output_path, elements_pages())
+    else:
+        for elem in elements_pages():
+            if sectPr is not None:
+                sectPr.addprevious(elem)
+            else:
+                body.append(elem)
+        enregistrer_docx(doc, template_path, output_path)
+    
+    compter("pages", len(pages_to_generate))
+    compter("apprenants", len(textes_apprenants))
+    
+    manifeste.enregistrer(output_path, empreinte_entrees)
+    manifeste.sauver()
+    if convertisseur is not None:
+        convertisseur.soumettre(output_path)
+    signaler("genere", f"✅ Feuille d'émargement générée : {output_path}", chemin=output_path)
     return output_path
 
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        json_path = sys.argv[1]
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        # Stocker le dossier client pour y générer le fichier
-        # Si le JSON est dans un sous-dossier data/, remonter au dossier client
-        source_dir = os.path.dirname(os.path.abspath(json_path))
-        if os.path.basename(source_dir) == "data":
-            source_dir = os.path.dirname(source_dir)  # Remonter au dossier client
-        if source_dir and source_dir != os.getcwd():
-            data["_source_dir"] = source_dir
-        generer_emargement(data)
+    parser = argparse.ArgumentParser(description="Génère la feuille d'émargement d'une formation (une page par jour).")
+    parser.add_argument("json_path", nargs="?", help="Fichier JSON de la formation")
+    parser.add_argument("--apprenants", metavar="FICHIER",
+                        help="Liste des apprenants en CSV ou JSONL, lue une fois (remplace celle du JSON)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Nombre de processus qui construisent les pages (défaut: 1, 0 = un par cœur)")
+    parser.add_argument("--flux", action="store_true",
+                        help="Écrire les pages dans le fichier au fur et à mesure (mémoire constante)")
+    options_communes(parser, "la feuille")
+    args = parser.parse_args()
+    
+    if args.json_path:
+        # Le fichier est généré dans le dossier client
+        data = charger_json(args.json_path)
+        if args.apprenants:
+            try:
+                data["apprenants"] = lire_apprenants(args.apprenants, "emargement")
+            except OSError as e:
+                parser.error(f"--apprenants : {e}")
+        verifier_ou_quitter(data, "emargement", seulement=args.verifier)
+        convertisseur = convertisseur_ou_quitter(parser, args)
+        try:
+            with profiler(sorties(args.profile, args.profile_jsonl), "emargement"), \
+                    (convertisseur or contextlib.nullcontext()):
+                generer_emargement(data, force=args.force, convertisseur=convertisseur, workers=args.workers,
+                                   flux=args.flux)
+        except SchemaInvalide as e:
+            # Ligne invalide dans le fichier --apprenants (lu une fois, avant le rendu)
+            quitter_invalide(e)
     else:
         exemple_data = {
             "nom_formation": "Prompt Engineering Avancé",
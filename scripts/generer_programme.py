@@ -6,72 +6,65 @@ Utilise le template "programme_pedagogique template.docx" comme base.
 Génère un programme pédagogique par formation.
 """
 
+import argparse
+import contextlib
 import json
-import sys
 import os
-from datetime import datetime
-from pathlib import Path
-from docx import Document
-from docx.shared import Pt, Cm
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import nsdecls
-from docx.oxml import parse_xml
+from commun import charger_json, trouver_template, verifier_ou_quitter, convertisseur_ou_quitter, options_communes
+from template_cache import charger_template
+from ecriture_docx import enregistrer_docx
+from placeholders import gras, index_placeholders, italique, puces
+from cache_fragments import Fragment
+from schema import valider
+from progression import point_annulation, signaler
+from mesures import profiler, sorties
+from incremental import Manifeste, empreinte_generation
 
 
-def format_date_fr(date_obj):
-    """Formate une date en français (ex: 16 décembre 2024)."""
-    mois = [
-        "", "janvier", "février", "mars", "avril", "mai", "juin",
-        "juillet", "août", "septembre", "octobre", "novembre", "décembre"
-    ]
-    return f"{date_obj.day} {mois[date_obj.month]} {date_obj.year}"
+# Version du rendu : à incrémenter quand la mise en forme produite change
+VERSION_GENERATEUR = 2
 
 
-def parse_date(date_str):
-    """Parse une date en différents formats."""
-    formats = ["%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%y"]
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str, fmt)
-        except ValueError:
-            continue
-    raise ValueError(f"Format de date non reconnu: {date_str}")
-
-
-def replace_in_paragraph(para, old_text, new_text):
-    """Remplace le texte dans un paragraphe en préservant le formatage si possible."""
-    if old_text not in para.text:
-        return False
-    
-    # Essayer de remplacer dans chaque run
-    for run in para.runs:
-        if old_text in run.text:
-            run.text = run.text.replace(old_text, new_text)
-            return True
-    
-    # Si fragmenté entre plusieurs runs, reconstruire le paragraphe
-    new_full_text = para.text.replace(old_text, new_text)
-    para.clear()
-    para.add_run(new_full_text)
-    return True
-
-
-def replace_in_cell(cell, old_text, new_text):
-    """Remplace le texte dans une cellule de tableau."""
-    for para in cell.paragraphs:
-        replace_in_paragraph(para, old_text, new_text)
-
-
-def format_list_to_bullets(items):
-    """Formate une liste en texte avec puces."""
-    if not items:
-        return ""
-    if isinstance(items, str):
-        return items
-    return "\n".join([f"• {item}" for item in items])
+def programme_detaille(modules):
+    """
+    Contenu de {{PROGRAMME_DETAILLE}} : pour chaque module, titre en gras, durée,
+    puis objectifs et contenu en listes à puces.
+    Chaque module est un Fragment : rendu une fois, puis repris du cache des fragments.
+    """
+    if not modules:
+        return "Programme détaillé à définir."
+    fragments = []
+    for i, module in enumerate(modules):
+        point_annulation()
+        titre = module.get("titre", f"Module {i+1}")
+        duree_module = module.get("duree", "")
+        contenu = module.get("contenu", [])
+        objectifs_module = module.get("objectifs", [])
+        
+        # Titre du module
+        segments = [gras(f"\n{titre}", taille=12)]
+        if duree_module:
+            segments.append(f" ({duree_module})")
+        
+        # Objectifs du module
+        if objectifs_module:
+            segments.append("\n")
+            segments.append(italique("Objectifs : "))
+            segments.append("".join(f"\n  • {obj}" for obj in objectifs_module))
+        
+        # Contenu du module
+        if contenu:
+            segments.append("\n")
+            segments.append(italique("Contenu : "))
+            segments.append("".join(f"\n  • {item}" for item in contenu))
+        
+        segments.append("\n")
+        fragments.append(Fragment(segments))
+    return fragments
 
 
-def generer_programme(data: dict, output_dir: str = None, template_path: str = "programme_pedagogique template.docx"):
+def generer_programme(data: dict, output_dir: str = None, template_path: str = "programme_pedagogique template.docx",
+                      force: bool = False, convertisseur=None):
     """
     Génère un programme pédagogique de formation.
     
@@ -79,19 +72,18 @@ def generer_programme(data: dict, output_dir: str = None, template_path: str = "
         data: Dictionnaire contenant les données de la formation
         output_dir: Dossier de sortie (défaut: dossier courant)
         template_path: Chemin vers le template Word
+        force: Régénérer même si les entrées n'ont pas changé
+        convertisseur: ConvertisseurPDF auquel soumettre le document (optionnel)
     
     Returns:
-        Chemin du fichier généré
+        Chemin du fichier généré (ou inchangé)
     """
     
+    # Vérifier toutes les données avant le rendu (toutes les erreurs en une fois)
+    valider(data, "programme")
+    
     # Trouver le template
-    template = Path(template_path)
-    if not template.exists():
-        script_dir = Path(__file__).parent
-        template = script_dir.parent / "templates" / template_path
-        if not template.exists():
-            raise FileNotFoundError(f"Template non trouvé: {template_path}")
-    template_path = str(template)
+    template_path = trouver_template(template_path)
     
     # Extraire les données
     nom_formation = data.get("nom_formation", "")
@@ -119,7 +111,7 @@ def generer_programme(data: dict, output_dir: str = None, template_path: str = "
     
     # Objectifs pédagogiques (liste)
     objectifs = data.get("objectifs_pedagogiques", [])
-    objectifs_str = format_list_to_bullets(objectifs)
+    objectifs_str = puces(objectifs)
     
     # Modules/Programme détaillé
     modules = data.get("modules", [])
@@ -131,7 +123,7 @@ def generer_programme(data: dict, output_dir: str = None, template_path: str = "
         "Études de cas concrets",
         "Échanges et partages d'expériences"
     ])
-    methodes_str = format_list_to_bullets(methodes)
+    methodes_str = puces(methodes)
     
     # Modalités d'évaluation
     evaluations = data.get("modalites_evaluation", [
@@ -140,7 +132,7 @@ def generer_programme(data: dict, output_dir: str = None, template_path: str = "
         "Évaluation sommative en fin de formation",
         "Questionnaire de satisfaction"
     ])
-    evaluations_str = format_list_to_bullets(evaluations)
+    evaluations_str = puces(evaluations)
     
     # Sanction de la formation
     sanction = data.get("sanction_formation", "Attestation de fin de formation et certificat de réalisation remis au stagiaire.")
@@ -151,9 +143,6 @@ def generer_programme(data: dict, output_dir: str = None, template_path: str = "
     print(f"   Modalité : {modalite or lieu}")
     print(f"   {len(modules)} module(s)")
     
-    # Charger le template
-    doc = Document(template_path)
-    
     # Préparer les remplacements de base
     replacements = {
         "{{NOM_FORMATION}}": nom_formation,
@@ -169,75 +158,9 @@ def generer_programme(data: dict, output_dir: str = None, template_path: str = "
         "{{METHODES_PEDAGOGIQUES}}": methodes_str,
         "{{MODALITES_EVALUATION}}": evaluations_str,
         "{{SANCTION_FORMATION}}": sanction,
+        "{{PROGRAMME_DETAILLE}}": programme_detaille(modules),
     }
     
-    # Remplacements dans les paragraphes
-    for para in doc.paragraphs:
-        # Traitement spécial pour le programme détaillé
-        if "{{PROGRAMME_DETAILLE}}" in para.text:
-            para.clear()
-            if modules:
-                for i, module in enumerate(modules):
-                    titre = module.get("titre", f"Module {i+1}")
-                    duree_module = module.get("duree", "")
-                    contenu = module.get("contenu", [])
-                    objectifs_module = module.get("objectifs", [])
-                    
-                    # Titre du module
-                    run_titre = para.add_run(f"\n{titre}")
-                    run_titre.bold = True
-                    run_titre.font.size = Pt(12)
-                    run_titre.font.name = "Calibri"
-                    
-                    if duree_module:
-                        run_duree = para.add_run(f" ({duree_module})")
-                        run_duree.font.size = Pt(11)
-                        run_duree.font.name = "Calibri"
-                    
-                    # Objectifs du module
-                    if objectifs_module:
-                        para.add_run("\n")
-                        run_obj_title = para.add_run("Objectifs : ")
-                        run_obj_title.italic = True
-                        run_obj_title.font.size = Pt(11)
-                        run_obj_title.font.name = "Calibri"
-                        
-                        for obj in objectifs_module:
-                            run_obj = para.add_run(f"\n  • {obj}")
-                            run_obj.font.size = Pt(11)
-                            run_obj.font.name = "Calibri"
-                    
-                    # Contenu du module
-                    if contenu:
-                        para.add_run("\n")
-                        run_cont_title = para.add_run("Contenu : ")
-                        run_cont_title.italic = True
-                        run_cont_title.font.size = Pt(11)
-                        run_cont_title.font.name = "Calibri"
-                        
-                        for item in contenu:
-                            run_item = para.add_run(f"\n  • {item}")
-                            run_item.font.size = Pt(11)
-                            run_item.font.name = "Calibri"
-                    
-                    para.add_run("\n")
-            else:
-                run = para.add_run("Programme détaillé à définir.")
-                run.font.name = "Calibri"
-                run.font.size = Pt(11)
-            continue
-        
-        # Remplacements standards
-        for old, new in replacements.items():
-            replace_in_paragraph(para, old, new)
-    
-    # Remplacements dans les tableaux
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for old, new in replacements.items():
-                    replace_in_cell(cell, old, new)
-    
     # Nom du fichier
     nom_clean = nom_formation[:50].replace(" ", "_").replace("/", "-").replace("'", "")
     filename = f"Programme_pedagogique_{nom_clean}.docx"
@@ -250,26 +173,48 @@ def generer_programme(data: dict, output_dir: str = None, template_path: str = "
     else:
         output_path = filename
     
-    doc.save(output_path)
-    print(f"   ✅ {filename}")
+    # Rien à faire si le programme existe déjà pour les mêmes entrées
+    manifeste = Manifeste(os.path.dirname(output_path))
+    empreinte_entrees = empreinte_generation(VERSION_GENERATEUR, template_path, replacements)
+    if not force and manifeste.a_jour(output_path, empreinte_entrees):
+        signaler("inchange", f"   ⏭️  {filename} (inchangé)", chemin=output_path)
+        if convertisseur is not None:
+            convertisseur.soumettre(output_path)
+        return output_path
+    
+    # Copie du template (parsé une seule fois par processus)
+    doc = charger_template(template_path)
+    index = index_placeholders(template_path)
+    
+    # Remplacements aux emplacements repérés dans le template (paragraphes et tableaux)
+    index.remplir(doc, replacements)
+    
+    enregistrer_docx(doc, template_path, output_path)
+    manifeste.enregistrer(output_path, empreinte_entrees)
+    manifeste.sauver()
+    if convertisseur is not None:
+        convertisseur.soumettre(output_path)
+    signaler("genere", f"   ✅ {filename}", chemin=output_path)
     print(f"\n🎉 Programme pédagogique généré : {output_path}")
     
     return output_path
 
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        json_path = sys.argv[1]
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        source_dir = os.path.dirname(os.path.abspath(json_path))
-        if os.path.basename(source_dir) == "data":
-            source_dir = os.path.dirname(source_dir)
-        if source_dir and source_dir != os.getcwd():
-            data["_source_dir"] = source_dir
-        generer_programme(data)
+    parser = argparse.ArgumentParser(description="Génère le programme pédagogique d'une formation.")
+    parser.add_argument("json_path", nargs="?", help="Fichier JSON de la formation")
+    options_communes(parser, "le document")
+    args = parser.parse_args()
+    
+    if args.json_path:
+        data = charger_json(args.json_path)
+        verifier_ou_quitter(data, "programme", seulement=args.verifier)
+        convertisseur = convertisseur_ou_quitter(parser, args)
+        with profiler(sorties(args.profile, args.profile_jsonl), "programme"), \
+                (convertisseur or contextlib.nullcontext()):
+            generer_programme(data, force=args.force, convertisseur=convertisseur)
     else:
-        print("Usage: python3 generer_programme.py <fichier.json>")
+        print("Usage: python3 generer_programme.py <fichier.json> [--force] [--pdf] [--verifier] [--profile]")
         print("\nExemple de structure JSON:")
         exemple = {
             "nom_formation": "Intégrer l'IA Générative à votre Activité",
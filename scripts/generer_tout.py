@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Génération groupée des documents de formation MINDNESS.
+Parcourt CLIENTS/*/data/*.json et génère, dans un seul processus, tous les
+documents que chaque JSON permet de produire (programme, convention,
+convocation, émargement, certificat). Les imports et les templates parsés
+sont partagés entre tous les clients.
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+from pathlib import Path
+from generer_programme import generer_programme
+from generer_convention import generer_convention
+from generer_convocation import generer_convocation
+from generer_emargement import generer_emargement
+from generer_certificat import generer_certificat
+from conversion_pdf import ConvertisseurPDF
+from parallele import EchecsApprenants, nombre_workers
+from commun import dossier_client, options_communes
+from mesures import profiler, sorties
+from schema import SchemaInvalide, analyser, manquants, valider
+
+
+# Documents qui acceptent l'option workers (par apprenant, ou par page pour l'émargement)
+AVEC_WORKERS = ("convocation", "certificat", "emargement")
+
+# Documents qui acceptent l'option flux (corps écrit au fur et à mesure)
+AVEC_FLUX = ("convention", "emargement")
+
+# Type de document -> fonction de génération (champs requis : voir schema.SCHEMAS)
+DOCUMENTS = {
+    "programme": generer_programme,
+    "convention": generer_convention,
+    "convocation": generer_convocation,
+    "emargement": generer_emargement,
+    "certificat": generer_certificat,
+}
+
+
+def documents_supportes(data):
+    """Retourne les types de documents dont ce JSON contient tous les champs obligatoires."""
+    return [type_doc for type_doc in DOCUMENTS if not manquants(data, type_doc)]
+
+
+def generer_document(type_doc, data, dossier=None, force=False):
+    """
+    Génère un type de document pour un JSON de formation.
+
+    Returns:
+        Liste des chemins générés (ou inchangés)
+    """
+    # Lève ValueError (type inconnu) ou SchemaInvalide (toutes les erreurs du JSON)
+    valider(data, type_doc)
+    if dossier:
+        data["_source_dir"] = dossier
+    resultat = DOCUMENTS[type_doc](data, force=force)
+    return resultat if isinstance(resultat, list) else [resultat]
+
+
+def lister_json(clients_dir):
+    """Liste les fichiers CLIENTS/*/data/*.json, triés."""
+    return sorted(Path(clients_dir).glob("*/data/*.json"))
+
+
+def generer_tout(clients_dir, types=None, workers=1, force=False, pdf=False, flux=False):
+    """
+    Génère tous les documents supportés pour chaque JSON client.
+
+    Args:
+        clients_dir: Dossier contenant les dossiers clients
+        types: Types de documents à générer (défaut: tous)
+        workers: Nombre de processus pour les documents par apprenant et les pages d'émargement
+        force: Régénérer même les documents dont les entrées n'ont pas changé
+        pdf: Convertir aussi les documents en PDF, pendant la génération
+        flux: Écrire les émargements et les conventions au fur et à mesure (mémoire constante)
+
+    Returns:
+        Dictionnaire {chemin JSON: {type: fichiers générés}} et liste des erreurs
+    """
+    resultats = {}
+    erreurs = []
+
+    # Lecture et validation de tous les JSON avant le premier rendu :
+    # les entrées invalides sont écartées (et signalées) d'emblée
+    a_traiter = []
+    for json_path in lister_json(clients_dir):
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except ValueError as e:
+            erreurs.append((str(json_path), "json", e))
+            print(f"❌ {json_path} : JSON illisible ({e})")
+            continue
+        if not isinstance(data, dict):
+            erreurs.append((str(json_path), "json", ValueError("le JSON doit être un objet")))
+            print(f"❌ {json_path} : le JSON doit être un objet")
+            continue
+        applicables = [t for t in documents_supportes(data) if types is None or t in types]
+        a_generer = []
+        for type_doc, problemes in analyser(data, applicables).items():
+            if problemes:
+                erreurs.append((str(json_path), type_doc, SchemaInvalide(type_doc, problemes)))
+                print(f"❌ {json_path} : {type_doc} écarté")
+                for probleme in problemes:
+                    print(f"   - {probleme}")
+            else:
+                a_generer.append(type_doc)
+        data["_source_dir"] = dossier_client(json_path)
+        a_traiter.append((json_path, data, a_generer))
+
+    # Un seul convertisseur PDF pour tout le lot : LibreOffice reste ouvert d'un client à l'autre
+    convertisseur = ConvertisseurPDF(workers=nombre_workers(workers)) if pdf else None
+    with convertisseur or contextlib.nullcontext():
+        for json_path, data, a_generer in a_traiter:
+            print(f"\n📁 {json_path} : {', '.join(a_generer) or 'aucun document'}")
+
+            resultats[str(json_path)] = {}
+            for type_doc in a_generer:
+                fonction = DOCUMENTS[type_doc]
+                options = {"force": force, "convertisseur": convertisseur}
+                if type_doc in AVEC_WORKERS:
+                    options["workers"] = workers
+                if flux and type_doc in AVEC_FLUX:
+                    options["flux"] = True
+                try:
+                    resultats[str(json_path)][type_doc] = fonction(data, **options)
+                except EchecsApprenants as e:
+                    # Documents réussis conservés, une erreur par apprenant en échec
+                    resultats[str(json_path)][type_doc] = e.fichiers
+                    erreurs.extend(
+                        (str(json_path), type_doc, RuntimeError(f"{apprenant} : {message}"))
+                        for apprenant, message in e.echecs
+                    )
+                except Exception as e:
+                    erreurs.append((str(json_path), type_doc, e))
+                    print(f"   ❌ {type_doc} : {e}")
+
+    if convertisseur is not None:
+        erreurs.extend((docx_path, "pdf", e) for docx_path, e in convertisseur.erreurs)
+
+    nb_json = len(resultats)
+    nb_docs = sum(len(docs) for docs in resultats.values())
+    print(f"\n🎉 {nb_json} fichier(s) JSON traité(s), {nb_docs} génération(s), {len(erreurs)} erreur(s)")
+    return resultats, erreurs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère tous les documents pour tous les clients.")
+    parser.add_argument("clients_dir", nargs="?", default=str(Path(__file__).parent.parent / "CLIENTS"),
+                        help="Dossier des clients (défaut: CLIENTS/)")
+    parser.add_argument("--types", help=f"Types à générer, séparés par des virgules ({','.join(DOCUMENTS)})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processus pour certificats, convocations et émargements (défaut: 1, 0 = un par cœur)")
+    parser.add_argument("--flux", action="store_true",
+                        help="Écrire émargements et conventions au fur et à mesure (mémoire constante)")
+    options_communes(parser, "les documents", verifier=False)
+    args = parser.parse_args()
+
+    types = None
+    if args.types:
+        types = [t.strip() for t in args.types.split(",") if t.strip()]
+        inconnus = [t for t in types if t not in DOCUMENTS]
+        if inconnus:
+            parser.error(f"Type(s) inconnu(s) : {', '.join(inconnus)}")
+
+    try:
+        with profiler(sorties(args.profile, args.profile_jsonl), "generer_tout"):
+            _, erreurs = generer_tout(args.clients_dir, types, args.workers, args.force, args.pdf, args.flux)
+    except RuntimeError as e:
+        parser.error(str(e))
+    sys.exit(1 if erreurs else 0)
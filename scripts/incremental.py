@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Régénération incrémentale des documents.
+Chaque fichier généré est associé à une empreinte de ses entrées (valeurs
+utilisées depuis le JSON, octets du template, version du générateur),
+enregistrée dans un manifeste du dossier de sortie. Un document dont
+l'empreinte n'a pas changé n'est pas régénéré.
+"""
+
+import hashlib
+import json
+import os
+from progression import signaler
+
+
+# Empreintes des templates déjà lus : chemin absolu -> (mtime, taille, empreinte)
+_empreintes_fichiers = {}
+
+
+def empreinte(*valeurs):
+    """Empreinte SHA-256 d'un ensemble de valeurs sérialisables en JSON."""
+    contenu = json.dumps(valeurs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(contenu.encode("utf-8")).hexdigest()
+
+
+def empreinte_fichier(path):
+    """Empreinte SHA-256 des octets d'un fichier (recalculée seulement s'il a changé)."""
+    chemin = os.path.abspath(path)
+    stat = os.stat(chemin)
+    entree = _empreintes_fichiers.get(chemin)
+    if entree is None or entree[:2] != (stat.st_mtime, stat.st_size):
+        with open(chemin, "rb") as f:
+            entree = (stat.st_mtime, stat.st_size, hashlib.sha256(f.read()).hexdigest())
+        _empreintes_fichiers[chemin] = entree
+    return entree[2]
+
+
+def empreinte_generation(version, template_path, *valeurs):
+    """Empreinte des entrées d'un document : version du générateur, template, valeurs."""
+    return empreinte(version, empreinte_fichier(template_path), *valeurs)
+
+
+class Manifeste:
+    """Empreintes des fichiers générés dans un dossier (fichier .generation.json)."""
+
+    NOM_FICHIER = ".generation.json"
+
+    def __init__(self, dossier):
+        self.path = os.path.join(dossier, self.NOM_FICHIER)
+        self.empreintes = {}
+        self.modifie = False
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.empreintes = json.load(f)
+            except (OSError, ValueError):
+                # Manifeste illisible : tout sera régénéré
+                self.empreintes = {}
+
+    def a_jour(self, output_path, empreinte_entrees):
+        """Vrai si le fichier existe et a été généré à partir des mêmes entrées."""
+        nom = os.path.basename(output_path)
+        return self.empreintes.get(nom) == empreinte_entrees and os.path.exists(output_path)
+
+    def enregistrer(self, output_path, empreinte_entrees):
+        """Mémorise l'empreinte d'un fichier qui vient d'être généré."""
+        self.empreintes[os.path.basename(output_path)] = empreinte_entrees
+        self.modifie = True
+
+    def sauver(self):
+        """Écrit le manifeste s'il a changé."""
+        if not self.modifie:
+            return
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.empreintes, f, indent=2, ensure_ascii=False, sort_keys=True)
+        self.modifie = False
+
+
+def selectionner(manifeste, cibles, force=False):
+    """
+    Sépare les documents à régénérer de ceux déjà à jour.
+
+    Args:
+        manifeste: Manifeste du dossier de sortie
+        cibles: Liste de (chemin de sortie, empreinte des entrées)
+        force: Tout régénérer sans consulter le manifeste
+
+    Returns:
+        (indices des cibles à régénérer, chemins inchangés)
+    """
+    a_generer = []
+    inchanges = []
+    for i, (output_path, empreinte_entrees) in enumerate(cibles):
+        if not force and manifeste.a_jour(output_path, empreinte_entrees):
+            inchanges.append(output_path)
+            signaler("inchange", f"   ⏭️  {os.path.basename(output_path)} (inchangé)", chemin=output_path)
+        else:
+            a_generer.append(i)
+    return a_generer, inchanges
+
+
+class Selection:
+    """
+    Sélection paresseuse des documents à régénérer dans un flux d'éléments (apprenants).
+    Chaque élément est examiné au moment où il est lu : la génération peut commencer
+    avant la fin du flux.
+    """
+
+    def __init__(self, manifeste, cible, force=False, au_inchange=None):
+        """
+        Args:
+            manifeste: Manifeste du dossier de sortie
+            cible: Fonction élément -> (chemin de sortie, empreinte des entrées)
+            force: Tout régénérer sans consulter le manifeste
+            au_inchange: Appelé avec le chemin de chaque document déjà à jour (optionnel)
+        """
+        self.manifeste = manifeste
+        self.cible = cible
+        self.force = force
+        self.au_inchange = au_inchange
+        self.chemins = []
+        self.inchanges = set()
+        self._empreintes = {}
+
+    def filtrer(self, elements):
+        """Produit les éléments dont le document doit être régénéré."""
+        for element in elements:
+            output_path, empreinte_entrees = self.cible(element)
+            self.chemins.append(output_path)
+            if not self.force and self.manifeste.a_jour(output_path, empreinte_entrees):
+                self.inchanges.add(output_path)
+                signaler("inchange", f"   ⏭️  {os.path.basename(output_path)} (inchangé)", chemin=output_path)
+                if self.au_inchange is not None:
+                    self.au_inchange(output_path)
+                continue
+            self._empreintes[output_path] = empreinte_entrees
+            yield element
+
+    def enregistrer(self, fichiers_generes):
+        """Mémorise les empreintes des documents générés et écrit le manifeste."""
+        for output_path in fichiers_generes:
+            self.manifeste.enregistrer(output_path, self._empreintes[output_path])
+        self.manifeste.sauver()
+
+    def resultats(self, fichiers_generes):
+        """Chemins produits (régénérés ou inchangés), dans l'ordre du flux."""
+        produits = set(fichiers_generes) | self.inchanges
+        return [output_path for output_path in self.chemins if output_path in produits]
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mesures des générateurs : durée de chaque phase (chargement du template,
+remplacements, construction des tableaux, enregistrement, PDF) et compteurs
+(apprenants, pages, lignes, octets écrits).
+Désactivées par défaut : phase() retourne alors un contexte vide partagé et
+compter() se limite à un test, le coût reste négligeable. --profile active la
+collecte le temps d'une génération et envoie le relevé aux sorties choisies
+(résumé sur stderr, ligne JSON dans un fichier).
+
+Usage:
+    with phase("tableaux"):
+        ...
+    compter("lignes", len(lignes))
+
+    with profiler(sorties(profile=True, jsonl="mesures.jsonl"), "certificat"):
+        generer_certificat(data)
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+
+# Phases mesurées, dans l'ordre du résumé
+PHASES = ("template", "remplacements", "tableaux", "enregistrement", "pdf")
+
+# Mesures en cours, ou None quand la collecte est désactivée
+_mesures = None
+
+# Contexte renvoyé par phase() quand rien n'est mesuré
+_AUCUNE = nullcontext()
+
+
+class Mesures:
+    """Durées cumulées par phase et compteurs d'une génération."""
+
+    def __init__(self, nom=""):
+        self.nom = nom
+        self.phases = {}
+        self.compteurs = {}
+        self.debut = time.perf_counter()
+        # Les conversions PDF sont mesurées depuis les threads du convertisseur
+        self._verrou = threading.Lock()
+
+    def ajouter_duree(self, nom, duree, appels=1):
+        with self._verrou:
+            total = self.phases.setdefault(nom, [0, 0.0])
+            total[0] += appels
+            total[1] += duree
+
+    def ajouter(self, nom, valeur):
+        with self._verrou:
+            self.compteurs[nom] = self.compteurs.get(nom, 0) + valeur
+
+    def fusionner(self, releve):
+        """Ajoute le relevé d'un worker (voir releve())."""
+        for nom, phase_worker in releve["phases"].items():
+            self.ajouter_duree(nom, phase_worker["secondes"], phase_worker["appels"])
+        for nom, valeur in releve["compteurs"].items():
+            self.ajouter(nom, valeur)
+
+    def releve(self):
+        """Relevé sérialisable : {"nom", "date", "duree", "phases", "compteurs"}."""
+        with self._verrou:
+            return {
+                "nom": self.nom,
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "duree": round(time.perf_counter() - self.debut, 6),
+                "phases": {
+                    nom: {"appels": appels, "secondes": round(duree, 6)}
+                    for nom, (appels, duree) in self.phases.items()
+                },
+                "compteurs": dict(self.compteurs),
+            }
+
+
+class _Phase:
+    """Chronomètre d'une phase (contexte)."""
+
+    __slots__ = ("mesures", "nom", "debut")
+
+    def __init__(self, mesures, nom):
+        self.mesures = mesures
+        self.nom = nom
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.mesures.ajouter_duree(self.nom, time.perf_counter() - self.debut)
+
+
+def actives():
+    """Vrai si une collecte est en cours."""
+    return _mesures is not None
+
+
+def phase(nom):
+    """Contexte qui ajoute sa durée à la phase `nom` (rien si la collecte est désactivée)."""
+    if _mesures is None:
+        return _AUCUNE
+    return _Phase(_mesures, nom)
+
+
+def compter(nom, valeur=1):
+    """Ajoute `valeur` au compteur `nom` (rien si la collecte est désactivée)."""
+    if _mesures is not None:
+        _mesures.ajouter(nom, valeur)
+
+
+def fusionner(releve):
+    """Ajoute aux mesures en cours le relevé d'un worker."""
+    if _mesures is not None:
+        _mesures.fusionner(releve)
+
+
+@contextmanager
+def mesurer(nom="", sorties=()):
+    """
+    Collecte les mesures le temps du bloc, puis envoie le relevé à chaque sortie.
+
+    Args:
+        nom: Nom de la génération mesurée (script, type de document...)
+        sorties: Fonctions appelées avec le relevé (dict) à la fin du bloc
+    """
+    global _mesures
+    precedent = _mesures
+    _mesures = mesures = Mesures(nom)
+    try:
+        yield mesures
+    finally:
+        _mesures = precedent
+        releve = mesures.releve()
+        for sortie in sorties:
+            sortie(releve)
+
+
+def resume_stderr(releve):
+    """Sortie : tableau des phases et des compteurs sur stderr."""
+    lignes = [f"⏱️  Mesures {releve['nom']} : {releve['duree']:.3f} s au total"]
+    phases = releve["phases"]
+    for nom in [nom for nom in PHASES if nom in phases] + sorted(set(phases) - set(PHASES)):
+        detail = phases[nom]
+        lignes.append(f"   {nom:<15} {detail['secondes']:>9.3f} s  ({detail['appels']} fois)")
+    for nom, valeur in sorted(releve["compteurs"].items()):
+        lignes.append(f"   {nom:<15} {valeur:>9}")
+    print("\n".join(lignes), file=sys.stderr)
+
+
+class SortieJSONL:
+    """Sortie : ajoute le relevé, sur une ligne JSON, à la fin d'un fichier."""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+
+    def __call__(self, releve):
+        with open(self.chemin, "a", encoding="utf-8") as f:
+            f.write(json.dumps(releve, ensure_ascii=False) + "\n")
+
+
+def sorties(profile=False, jsonl=None):
+    """Sorties demandées par --profile et --profile-jsonl (liste vide = pas de mesure)."""
+    resultat = []
+    if profile or jsonl:
+        resultat.append(resume_stderr)
+    if jsonl:
+        resultat.append(SortieJSONL(jsonl))
+    return resultat
+
+
+def profiler(sorties_profil, nom=""):
+    """Contexte de mesure d'un script : collecte seulement si des sorties sont demandées."""
+    if not sorties_profil:
+        return nullcontext()
+    return mesurer(nom, sorties_profil)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exécution des documents par apprenant (certificats, convocations),
+en séquentiel ou réparti sur un pool de processus.
+"""
+
+import gc
+import os
+from collections import deque
+from functools import partial
+from progression import signaler
+from mesures import actives, compter, fusionner, mesurer
+
+
+# Tâches soumises d'avance par worker (borne la mémoire sur les longues listes)
+EN_VOL_PAR_WORKER = 4
+
+# Documents générés entre deux passages complets du ramasse-miettes
+DOCUMENTS_PAR_RAMASSAGE = 32
+
+# Documents générés par ce processus depuis le dernier passage
+_documents_depuis_ramassage = 0
+
+
+class EchecsApprenants(RuntimeError):
+    """
+    Documents par apprenant en échec : levée après la génération des autres.
+    `fichiers` : chemins produits malgré tout ; `echecs` : liste de (apprenant, message).
+    """
+
+    def __init__(self, type_doc, fichiers, echecs):
+        self.type_doc = type_doc
+        self.fichiers = list(fichiers)
+        self.echecs = list(echecs)
+        # Arguments du constructeur dans args : l'exception traverse pickle (pool de processus)
+        super().__init__(type_doc, self.fichiers, self.echecs)
+
+    def __str__(self):
+        return f"{len(self.echecs)} {self.type_doc}(s) en erreur : " + " ; ".join(
+            f"{apprenant} : {message}" for apprenant, message in self.echecs
+        )
+
+
+def echecs(erreurs):
+    """(apprenant, message) de chaque erreur retournée par executer_par_apprenant."""
+    return [
+        (f"{apprenant.get('nom', '')} {apprenant.get('prenom', '')}".strip(), str(erreur))
+        for apprenant, erreur in erreurs
+    ]
+
+
+def nombre_workers(workers):
+    """Normalise l'option workers : 0 ou négatif = un worker par cœur."""
+    if workers is None:
+        return 1
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _executer_tache(fonction, contexte, apprenant):
+    """
+    Génère le document d'un apprenant. Un Document python-docx forme des cycles de
+    références (parties <-> package) qui ne sont libérés que par un passage complet
+    du ramasse-miettes : sans passage régulier, la mémoire croît avec la liste.
+    """
+    global _documents_depuis_ramassage
+    try:
+        return fonction(contexte, apprenant)
+    finally:
+        _documents_depuis_ramassage += 1
+        if _documents_depuis_ramassage >= DOCUMENTS_PAR_RAMASSAGE:
+            _documents_depuis_ramassage = 0
+            gc.collect()
+
+
+def _executer_tache_mesuree(fonction, contexte, apprenant):
+    """Dans un worker : génère le document et retourne aussi les mesures prises pendant le rendu."""
+    with mesurer() as mesures:
+        output_path = _executer_tache(fonction, contexte, apprenant)
+    return output_path, mesures.releve()
+
+
+def executer_par_apprenant(fonction, contexte, apprenants, workers=1, au_fichier=None):
+    """
+    Appelle fonction(contexte, apprenant) pour chaque apprenant.
+    Les échecs sont signalés fichier par fichier sans interrompre les autres.
+
+    Args:
+        fonction: Fonction de niveau module (sérialisable) retournant le chemin généré
+        contexte: Données communes à tous les apprenants
+        apprenants: Liste ou flux (itérable paresseux) des apprenants
+        workers: Nombre de processus (1 = séquentiel, 0 = un par cœur)
+        au_fichier: Appelé avec chaque chemin dès qu'il est généré (ex: conversion PDF)
+
+    Returns:
+        (chemins générés dans l'ordre des apprenants, liste des (apprenant, erreur))
+    """
+    workers = nombre_workers(workers)
+    if hasattr(apprenants, "__len__"):
+        workers = min(workers, max(len(apprenants), 1))
+    # Mesures (--profile) : chaque worker renvoie les siennes avec le document
+    mesure_workers = workers > 1 and actives()
+    tache = partial(_executer_tache_mesuree if mesure_workers else _executer_tache, fonction, contexte)
+    fichiers = []
+    erreurs = []
+
+    def collecter(apprenant, obtenir_resultat):
+        try:
+            resultat = obtenir_resultat()
+        except Exception as e:
+            erreurs.append((apprenant, e))
+            signaler("erreur", f"   ❌ {apprenant.get('nom', '')} {apprenant.get('prenom', '')} : {e}",
+                     nom=apprenant.get("nom", ""), prenom=apprenant.get("prenom", ""), erreur=str(e))
+            return
+        if mesure_workers:
+            resultat, releve = resultat
+            fusionner(releve)
+        output_path = resultat
+        compter("apprenants")
+        fichiers.append(output_path)
+        signaler("genere", f"   ✅ {os.path.basename(output_path)}", chemin=output_path)
+        if au_fichier is not None:
+            au_fichier(output_path)
+
+    if workers == 1:
+        for apprenant in apprenants:
+            collecter(apprenant, partial(tache, apprenant))
+        return fichiers, erreurs
+
+    # Importé ici : le mode séquentiel (et un --help) n'en paie pas le coût
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Au plus EN_VOL_PAR_WORKER tâches en attente par worker : les apprenants
+        # sont lus au fur et à mesure (liste ou flux paresseux)
+        en_vol = deque()
+        for apprenant in apprenants:
+            en_vol.append((apprenant, executor.submit(tache, apprenant)))
+            if len(en_vol) >= workers * EN_VOL_PAR_WORKER:
+                collecter(*_resultat(en_vol.popleft()))
+        # Les résultats sont lus dans l'ordre de soumission : l'ordre des apprenants est conservé
+        while en_vol:
+            collecter(*_resultat(en_vol.popleft()))
+    return fichiers, erreurs
+
+
+def _resultat(tache_soumise):
+    apprenant, future = tache_soumise
+    return apprenant, future.result
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index compilé des placeholders {{TOKEN}} d'un template Word.
+Le template est parcouru une seule fois pour repérer chaque token
+(partie, paragraphe, noeuds de texte concernés, y compris un token coupé sur
+plusieurs runs). Le remplissage d'un document n'écrit ensuite qu'à ces
+emplacements, directement dans les noeuds <w:t> : les runs et leur mise en
+forme sont conservés, un token coupé est regroupé dans son premier run.
+
+Une valeur peut être un texte (les retours à la ligne deviennent des sauts de
+ligne) ou une liste de segments mis en forme :
+    [gras("Module 1"), " (3 heures)", "\n", italique("Objectifs : ")]
+Chaque segment reprend la mise en forme (rPr) du run qui contenait le token.
+Un Fragment (cache_fragments) regroupe des segments rendus une seule fois,
+puis recopiés depuis le cache.
+
+Les templates à marqueurs littéraux (certificat, émargement) utilisent Marqueurs,
+qui applique les mêmes remplacements en place.
+"""
+
+import os
+import re
+from bisect import bisect_right
+from collections import namedtuple
+from copy import deepcopy
+from cache_fragments import Fragment
+from commun import RT, OxmlElement, Paragraph, Pt, Run, qn
+from mesures import phase
+from template_cache import charger_template_parse
+
+
+TOKEN_RE = re.compile(r"\{\{[A-Z0-9_]+\}\}")
+
+# Attribut xml:space (espaces de début et de fin conservés dans un <w:t>)
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+# Position d'un token : partie, n° de paragraphe dans la partie,
+# noeud <w:t> de début + offset, noeud <w:t> de fin + offset (exclu)
+Emplacement = namedtuple(
+    "Emplacement", "token partie paragraphe noeud_debut offset_debut noeud_fin offset_fin"
+)
+
+# Segment d'une valeur mise en forme (None = mise en forme du run d'origine ; taille en points)
+Segment = namedtuple("Segment", "texte gras italique taille", defaults=(None, None, None))
+
+# Index déjà compilés : chemin absolu -> (mtime, PlaceholderIndex)
+_index = {}
+
+
+def gras(texte, taille=None):
+    """Segment en gras."""
+    return Segment(texte, gras=True, taille=taille)
+
+
+def italique(texte, taille=None):
+    """Segment en italique."""
+    return Segment(texte, italique=True, taille=taille)
+
+
+def puces(elements, prefixe="• "):
+    """Liste à puces : un élément par ligne."""
+    if isinstance(elements, str):
+        return elements
+    return "\n".join(f"{prefixe}{element}" for element in elements)
+
+
+def parties_du_document(doc):
+    """Liste les éléments racines à parcourir : corps, puis en-têtes et pieds de page."""
+    parties = [doc.element.body]
+    rels = doc.part.rels
+    for rId in sorted(rels):
+        rel = rels[rId]
+        if rel.is_external or rel.reltype not in (RT.HEADER, RT.FOOTER):
+            continue
+        parties.append(rel.target_part.element)
+    return parties
+
+
+def noeuds_texte(p):
+    """Noeuds <w:t> des runs d'un paragraphe, dans l'ordre."""
+    t = qn("w:t")
+    return [noeud for r in p.r_lst for noeud in r.iterchildren(t)]
+
+
+def _localiser(p, motif, prefixe=None):
+    """
+    Cherche `motif` dans le texte d'un paragraphe, en une seule lecture de ses noeuds <w:t>.
+    Retourne les correspondances avec leur étendue en (noeud <w:t>, offset).
+    `prefixe` : texte sans lequel aucune correspondance n'est possible (paragraphe ignoré).
+    """
+    t, sauts = qn("w:t"), (qn("w:br"), qn("w:cr"), qn("w:tab"))
+    morceaux = []
+    debuts = []
+    pos = 0
+    for r in p.r_lst:
+        for enfant in r:
+            if enfant.tag == t:
+                texte = enfant.text or ""
+                debuts.append(pos)
+            elif enfant.tag in sauts:
+                # Un token ne traverse jamais un saut de ligne ou une tabulation
+                texte = "\n"
+            else:
+                continue
+            morceaux.append(texte)
+            pos += len(texte)
+    full_text = "".join(morceaux)
+    if prefixe is not None and prefixe not in full_text:
+        return []
+
+    resultats = []
+    for match in motif.finditer(full_text):
+        noeud_debut = bisect_right(debuts, match.start()) - 1
+        noeud_fin = bisect_right(debuts, match.end() - 1) - 1
+        offset_debut = match.start() - debuts[noeud_debut]
+        offset_fin = match.end() - debuts[noeud_fin]
+        resultats.append((match, noeud_debut, offset_debut, noeud_fin, offset_fin))
+    return resultats
+
+
+def ecrire_texte(noeud, texte):
+    """Écrit le texte d'un noeud <w:t> en conservant ses espaces de début et de fin."""
+    noeud.text = texte
+    if texte and (texte[0].isspace() or texte[-1].isspace()):
+        noeud.set(XML_SPACE, "preserve")
+
+
+def remplacer_etendue(noeuds, debut, offset_debut, fin, offset_fin, valeur):
+    """
+    Remplace le texte entre (debut, offset_debut) et (fin, offset_fin) par `valeur`,
+    dans le premier noeud : les noeuds intermédiaires sont retirés (et leur run s'il
+    devient vide), le dernier garde ce qui suit l'étendue.
+    """
+    premier = noeuds[debut]
+    if debut == fin:
+        texte = premier.text or ""
+        ecrire_texte(premier, texte[:offset_debut] + valeur + texte[offset_fin:])
+        return
+    ecrire_texte(premier, (premier.text or "")[:offset_debut] + valeur)
+    dernier = noeuds[fin]
+    ecrire_texte(dernier, (dernier.text or "")[offset_fin:])
+    rpr = qn("w:rPr")
+    for noeud in noeuds[debut + 1:fin]:
+        run = noeud.getparent()
+        run.remove(noeud)
+        if run is not premier.getparent() and all(enfant.tag == rpr for enfant in run):
+            run.getparent().remove(run)
+
+
+def inserer_segments(noeud, offset, segments):
+    """
+    Insère des segments mis en forme dans le run de `noeud`, à `offset` :
+    le run est coupé en deux et un run par segment est ajouté entre les deux moitiés,
+    chacun avec une copie du rPr d'origine (les runs d'un Fragment viennent du cache).
+    """
+    if isinstance(segments, str):
+        segments = [segments]
+    run = noeud.getparent()
+    rpr = run.find(qn("w:rPr"))
+
+    # La suite du run (texte après l'offset, éléments suivants) passe dans un nouveau run
+    texte = noeud.text or ""
+    suivants = list(noeud.itersiblings())
+    suite = None
+    if texte[offset:] or suivants:
+        suite = OxmlElement("w:r")
+        if rpr is not None:
+            suite.append(deepcopy(rpr))
+        if texte[offset:]:
+            noeud_suite = OxmlElement("w:t")
+            ecrire_texte(noeud_suite, texte[offset:])
+            suite.append(noeud_suite)
+        suite.extend(suivants)
+    ecrire_texte(noeud, texte[:offset])
+
+    ancre = run
+    for segment in segments:
+        if isinstance(segment, Fragment):
+            runs = segment.runs(rpr, creer_run)
+        else:
+            runs = [creer_run(rpr, segment)]
+        for r in runs:
+            ancre.addnext(r)
+            ancre = r
+    if suite is not None:
+        ancre.addnext(suite)
+
+
+def creer_run(rpr, segment):
+    """Run d'un segment (texte ou Segment), avec une copie du rPr d'origine."""
+    if isinstance(segment, str):
+        segment = Segment(segment)
+    r = OxmlElement("w:r")
+    if rpr is not None:
+        r.append(deepcopy(rpr))
+    nouveau = Run(r, None)
+    if segment.gras is not None:
+        nouveau.bold = segment.gras
+    if segment.italique is not None:
+        nouveau.italic = segment.italique
+    if segment.taille is not None:
+        nouveau.font.size = Pt(segment.taille)
+    nouveau.text = segment.texte
+    return r
+
+
+def _riche(valeur):
+    """Vrai si la valeur ne peut pas s'écrire directement dans un noeud <w:t>."""
+    return not isinstance(valeur, str) or "\n" in valeur or "\t" in valeur
+
+
+class PlaceholderIndex:
+    """Emplacements des placeholders d'un template, réutilisables sur chaque copie."""
+
+    def __init__(self, emplacements):
+        self.emplacements = emplacements
+        self.tokens = {e.token for e in emplacements}
+
+    def _paragraphes_doc(self, doc):
+        """Résout les paragraphes indexés dans une copie du template."""
+        parties = parties_du_document(doc)
+        paragraphes = {}
+        for num_partie in {e.partie for e in self.emplacements}:
+            tous = list(parties[num_partie].iter(qn("w:p")))
+            for e in self.emplacements:
+                if e.partie == num_partie:
+                    paragraphes[(num_partie, e.paragraphe)] = tous[e.paragraphe]
+        return paragraphes
+
+    def paragraphes(self, doc, token):
+        """Retourne les paragraphes de `doc` qui contenaient `token` dans le template."""
+        trouves = self._paragraphes_doc(doc)
+        resultat = []
+        for e in self.emplacements:
+            p = trouves[(e.partie, e.paragraphe)]
+            if e.token == token and p not in resultat:
+                resultat.append(p)
+        return [Paragraph(p, None) for p in resultat]
+
+    def remplir(self, doc, valeurs):
+        """
+        Remplace les tokens connus de `valeurs` (textes ou listes de segments)
+        dans une copie intacte du template.
+        Doit être appelé avant toute modification de structure du document.
+        """
+        with phase("remplacements"):
+            self._remplir(doc, valeurs)
+
+    def _remplir(self, doc, valeurs):
+        paragraphes = self._paragraphes_doc(doc)
+        noeuds_par_paragraphe = {}
+
+        # Traiter les tokens de la fin vers le début : les positions restent valides
+        for e in reversed(self.emplacements):
+            if e.token not in valeurs:
+                continue
+            cle = (e.partie, e.paragraphe)
+            noeuds = noeuds_par_paragraphe.get(cle)
+            if noeuds is None:
+                noeuds = noeuds_par_paragraphe[cle] = noeuds_texte(paragraphes[cle])
+            valeur = valeurs[e.token]
+            if not _riche(valeur):
+                remplacer_etendue(noeuds, e.noeud_debut, e.offset_debut, e.noeud_fin, e.offset_fin, valeur)
+                continue
+            remplacer_etendue(noeuds, e.noeud_debut, e.offset_debut, e.noeud_fin, e.offset_fin, "")
+            inserer_segments(noeuds[e.noeud_debut], e.offset_debut, valeur)
+
+
+def compiler_placeholders(doc):
+    """Parcourt un document une fois et retourne l'index de ses placeholders."""
+    emplacements = []
+    for num_partie, partie in enumerate(parties_du_document(doc)):
+        for num_para, p in enumerate(partie.iter(qn("w:p"))):
+            for match, noeud_debut, offset_debut, noeud_fin, offset_fin in _localiser(p, TOKEN_RE, "{{"):
+                emplacements.append(Emplacement(
+                    match.group(), num_partie, num_para, noeud_debut, offset_debut, noeud_fin, offset_fin
+                ))
+    return PlaceholderIndex(emplacements)
+
+
+def index_placeholders(template_path):
+    """Retourne l'index compilé d'un template (compilé une seule fois par processus)."""
+    chemin = os.path.abspath(template_path)
+    mtime = os.path.getmtime(chemin)
+
+    entree = _index.get(chemin)
+    if entree is None or entree[0] != mtime:
+        entree = (mtime, compiler_placeholders(charger_template_parse(chemin)))
+        _index[chemin] = entree
+    return entree[1]
+
+
+class Marqueurs:
+    """
+    Marqueurs littéraux d'un template sans placeholders {{...}} (ex: "NOM PRENOM", "XXXXX"),
+    reconnus par une seule expression compilée : chaque paragraphe est lu une fois,
+    ceux qui ne contiennent aucun marqueur ne sont pas modifiés.
+
+    Usage:
+        MARQUEURS = Marqueurs(["NOM PRENOM", "DATE"])
+        MARQUEURS.remplir(element, {"NOM PRENOM": "DUPONT Jean", "DATE": ("16/12/2024", "17/12/2024")})
+    """
+
+    def __init__(self, marqueurs):
+        # Les plus longs d'abord : "M. ALBOUZE Alexis" l'emporte sur "ALBOUZE Alexis"
+        self.marqueurs = sorted(marqueurs, key=len, reverse=True)
+        # Une espace du marqueur reconnaît aussi l'espace insécable du template
+        self.motif = re.compile("|".join(
+            "(" + re.escape(marqueur).replace("\\ ", "[ \xa0]") + ")" for marqueur in self.marqueurs
+        ))
+
+    def remplir(self, element, valeurs):
+        """
+        Remplace les marqueurs dans tous les paragraphes de `element` (corps, tableau...),
+        en conservant les runs et leur mise en forme.
+
+        Args:
+            element: Élément XML à parcourir
+            valeurs: Dictionnaire {marqueur: texte}. Un tuple donne les valeurs des
+                occurrences successives, dans l'ordre du document ; la dernière est
+                reprise pour les occurrences suivantes (ex: "DATE" -> (début, fin)).
+        """
+        with phase("remplacements"):
+            self._remplir(element, valeurs)
+
+    def _remplir(self, element, valeurs):
+        occurrences = {}
+        for p in element.iter(qn("w:p")):
+            trouves = _localiser(p, self.motif)
+            if not trouves:
+                continue
+            remplacements = []
+            for match, *etendue in trouves:
+                marqueur = self.marqueurs[match.lastindex - 1]
+                valeur = valeurs[marqueur]
+                if isinstance(valeur, tuple):
+                    rang = occurrences.get(marqueur, 0)
+                    occurrences[marqueur] = rang + 1
+                    valeur = valeur[min(rang, len(valeur) - 1)]
+                remplacements.append((etendue, valeur))
+            # De la fin vers le début : les positions restent valides
+            noeuds = noeuds_texte(p)
+            for etendue, valeur in reversed(remplacements):
+                remplacer_etendue(noeuds, *etendue, valeur)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Événements de progression des générateurs (document généré, inchangé, en erreur).
+Par défaut chaque événement est affiché comme avant ; un abonné (API asynchrone,
+service...) peut les recevoir sous forme de dictionnaires à la place.
+Les boucles longues des générateurs (pages, apprenants, lignes) appellent
+point_annulation() : une génération annulée s'arrête en cours de document.
+"""
+
+import time
+from contextlib import contextmanager
+
+
+# Fonction appelée avec chaque événement (dict), ou None pour afficher les messages
+_abonne = None
+
+# Fonction qui lève GenerationAnnulee si l'arrêt est demandé, ou None
+_annulation = None
+
+# Intervalle minimal entre deux vérifications (elles peuvent traverser les processus)
+INTERVALLE_ANNULATION = 0.1
+_derniere_verification = 0.0
+
+
+class GenerationAnnulee(Exception):
+    """Levée au prochain événement ou point d'annulation quand l'abonné demande l'arrêt."""
+
+
+def signaler(evenement, message, **details):
+    """
+    Signale un événement de progression.
+
+    Args:
+        evenement: Type d'événement ("genere", "inchange", "erreur")
+        message: Texte affiché quand personne n'est abonné
+        details: Données structurées de l'événement (chemin, erreur...)
+    """
+    if _abonne is None:
+        print(message)
+        return
+    _abonne({"evenement": evenement, **details})
+
+
+def point_annulation():
+    """Dans les boucles longues : lève GenerationAnnulee si l'abonné demande l'arrêt."""
+    global _derniere_verification
+    if _annulation is None:
+        return
+    maintenant = time.monotonic()
+    if maintenant - _derniere_verification < INTERVALLE_ANNULATION:
+        return
+    _derniere_verification = maintenant
+    _annulation()
+
+
+@contextmanager
+def abonner(fonction, annulation=None):
+    """
+    Redirige les événements vers `fonction` le temps du bloc.
+
+    Args:
+        annulation: Appelée aux points d'annulation, lève GenerationAnnulee pour arrêter
+    """
+    global _abonne, _annulation, _derniere_verification
+    precedents = _abonne, _annulation
+    _abonne, _annulation = fonction, annulation
+    _derniere_verification = 0.0
+    try:
+        yield
+    finally:
+        _abonne, _annulation = precedents
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prototypes de lignes de tableau (w:tr).
+Une ligne entièrement mise en forme est construite une seule fois ; chaque
+nouvelle ligne en est une copie profonde dont seuls les textes changent.
+"""
+
+from copy import deepcopy
+from commun import qn
+from fragments import cloner, rpr_calibri
+
+
+# Texte provisoire des emplacements de texte d'un prototype
+MARQUEUR = "X"
+
+
+class PrototypeLigne:
+    """Ligne modèle : chaque w:t du prototype est un emplacement de texte, dans l'ordre."""
+
+    def __init__(self, tr):
+        self.tr = tr
+
+    def creer(self, *textes):
+        """Retourne une copie de la ligne avec les textes donnés (dans l'ordre des w:t)."""
+        tr = deepcopy(self.tr)
+        for t, texte in zip(tr.iter(qn('w:t')), textes):
+            t.text = texte
+            if texte != texte.strip():
+                t.set(qn('xml:space'), 'preserve')
+        return tr
+
+
+def prototype_ligne_table(table, demi_points=22):
+    """
+    Construit une ligne Calibri (11pt par défaut) du tableau avec python-docx (une seule fois),
+    puis la retire du tableau pour en faire un prototype (un texte par cellule).
+    """
+    row = table.add_row()
+    for cell in row.cells:
+        cell.text = ""
+        run = cell.paragraphs[0].add_run(MARQUEUR)
+        run._r.insert(0, cloner(rpr_calibri(demi_points)))
+    tr = row._tr
+    tr.getparent().remove(tr)
+    return PrototypeLigne(tr)
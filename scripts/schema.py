@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Validation du JSON unifié des formations (voir INSTRUCTIONS.md), partagée
+par les cinq générateurs.
+Les règles sont compilées une seule fois à l'import : chaque champ est vérifié
+une seule fois par JSON, même si plusieurs documents l'utilisent, et toutes les
+erreurs sont rapportées ensemble, avant tout rendu.
+
+Usage:
+    valider(data, "certificat")       # lève SchemaInvalide avec toutes les erreurs
+    rapport = analyser(data)          # {type: erreurs} pour tous les documents
+"""
+
+import numbers
+from collections.abc import Iterator
+from dates import parse_date
+
+
+class SchemaInvalide(ValueError):
+    """JSON de formation invalide pour un document ; `erreurs` contient tous les problèmes."""
+
+    def __init__(self, type_doc, erreurs):
+        self.type_doc = type_doc
+        self.erreurs = list(erreurs)
+        # Arguments du constructeur dans args : l'exception traverse pickle (pool de processus)
+        super().__init__(type_doc, self.erreurs)
+
+    def __str__(self):
+        return f"Données invalides pour {self.type_doc} : " + " ; ".join(self.erreurs)
+
+
+# --- Vérifications élémentaires : (valeur, chemin) -> liste d'erreurs ---
+
+def _texte(valeur, chemin):
+    if not isinstance(valeur, str):
+        return [f"{chemin} doit être un texte"]
+    return []
+
+
+def _texte_non_vide(valeur, chemin):
+    if not isinstance(valeur, str) or not valeur.strip():
+        return [f"{chemin} doit être un texte non vide"]
+    return []
+
+
+def _nombre(valeur, chemin):
+    # Les durées sont affichées telles quelles : un nombre ou un texte numérique ("14", "32,5")
+    if isinstance(valeur, bool):
+        return [f"{chemin} doit être un nombre"]
+    if isinstance(valeur, numbers.Number):
+        return []
+    if isinstance(valeur, str):
+        try:
+            float(valeur.replace(",", "."))
+            return []
+        except ValueError:
+            pass
+    return [f"{chemin} doit être un nombre"]
+
+
+def _lire_date(valeur):
+    """Date lue dans l'un des formats acceptés, ou None (la lecture est mémorisée pour le rendu)."""
+    if isinstance(valeur, str):
+        try:
+            return parse_date(valeur)
+        except ValueError:
+            pass
+    return None
+
+
+def _date(valeur, chemin):
+    if _lire_date(valeur) is None:
+        return [f"{chemin} : date non reconnue ({valeur!r}, attendu JJ/MM/AAAA)"]
+    return []
+
+
+def _date_optionnelle(valeur, chemin):
+    # Vide = valeur par défaut du générateur (aujourd'hui, date de fin...)
+    return _date(valeur, chemin) if valeur else []
+
+
+def _textes(valeur, chemin):
+    """Texte seul ou liste de textes (ex: formateurs)."""
+    if isinstance(valeur, str):
+        return []
+    if not isinstance(valeur, list):
+        return [f"{chemin} doit être un texte ou une liste de textes"]
+    return [erreur for i, element in enumerate(valeur) for erreur in _texte(element, f"{chemin}[{i}]")]
+
+
+def _objet(champs):
+    """Dictionnaire dont les `champs` {nom: vérification} sont obligatoires."""
+    def verifier(valeur, chemin):
+        if not isinstance(valeur, dict):
+            return [f"{chemin} doit être un objet"]
+        erreurs = []
+        for nom, verification in champs.items():
+            if nom not in valeur:
+                erreurs.append(f"{chemin}.{nom} manquant")
+            else:
+                erreurs.extend(verification(valeur[nom], f"{chemin}.{nom}"))
+        return erreurs
+    return verifier
+
+
+def _liste(element):
+    """Liste dont chaque élément passe la vérification `element`."""
+    def verifier(valeur, chemin):
+        if not isinstance(valeur, list):
+            return [f"{chemin} doit être une liste"]
+        erreurs = []
+        for i, item in enumerate(valeur):
+            erreurs.extend(element(item, f"{chemin}[{i}]"))
+        return erreurs
+    return verifier
+
+
+def _apprenants(element):
+    """Liste d'apprenants, ou flux lu au fil d'un fichier (--apprenants)."""
+    liste = _liste(element)
+
+    def verifier(valeur, chemin):
+        if isinstance(valeur, Iterator):
+            # Chaque ligne du fichier est vérifiée à la lecture
+            # (apprenants.lire_apprenants, voir verifier_apprenant)
+            return []
+        return liste(valeur, chemin)
+    return verifier
+
+
+_creneau = _objet({"debut": _texte_non_vide, "fin": _texte_non_vide})
+
+# Règles de chaque champ connu du JSON unifié
+CHAMPS = {
+    "nom_formation": _texte_non_vide,
+    "date_debut": _date,
+    "date_fin": _date,
+    "date_emission": _date_optionnelle,
+    "date_signature": _date_optionnelle,
+    "lieu": _texte,
+    "duree_heures": _nombre,
+    "duree_jours": _nombre,
+    "formateurs": _textes,
+    "ville_signature": _texte,
+    "lieu_signature": _texte,
+    "lien_ressources": _texte,
+    "sessions": _liste(_objet({"date": _date, "debut": _texte_non_vide, "fin": _texte_non_vide})),
+    "horaires": _objet({"matin": _creneau, "apres_midi": _creneau}),
+    "intervenants_par_jour": _objet({}),
+    "modules": _liste(_objet({})),
+    "objectifs_pedagogiques": _textes,
+    "beneficiaire": _objet({}),
+    "contenu_pedagogique": _textes,
+}
+
+# Champs obligatoires des apprenants, par document
+_APPRENANT = _objet({"nom": _texte_non_vide, "prenom": _texte_non_vide})
+_APPRENANT_EMAIL = _objet({"nom": _texte_non_vide, "prenom": _texte_non_vide, "email": _texte})
+
+# Type de document -> (champs obligatoires, champs optionnels utilisés, vérification des apprenants)
+SCHEMAS = {
+    "programme": (
+        ["nom_formation"],
+        ["modules", "duree_heures", "duree_jours", "lieu", "formateurs", "objectifs_pedagogiques"],
+        None,
+    ),
+    "convention": (
+        ["beneficiaire", "nom_formation", "date_debut", "date_fin"],
+        ["date_signature", "lieu_signature", "lieu", "duree_heures", "duree_jours", "contenu_pedagogique"],
+        _objet({}),
+    ),
+    "convocation": (
+        ["nom_formation", "date_debut", "date_fin", "duree_heures", "duree_jours", "apprenants"],
+        ["date_emission", "lien_ressources", "formateurs", "sessions", "lieu"],
+        _APPRENANT,
+    ),
+    "emargement": (
+        ["nom_formation", "date_debut", "date_fin", "lieu", "duree_heures", "formateurs", "apprenants"],
+        ["sessions", "horaires", "ville_signature", "intervenants_par_jour"],
+        _APPRENANT_EMAIL,
+    ),
+    "certificat": (
+        ["nom_formation", "date_debut", "date_fin", "duree_heures", "apprenants"],
+        ["date_signature", "lieu_signature"],
+        _APPRENANT,
+    ),
+}
+
+
+def _compiler():
+    """
+    Prépare, pour chaque document, la liste (champ, vérification)
+    et les vérifications d'apprenants distinctes (partagées entre documents).
+    """
+    compiles = {}
+    listes = {}
+    for type_doc, (requis, optionnels, apprenant) in SCHEMAS.items():
+        regles = [(champ, CHAMPS.get(champ)) for champ in requis + optionnels]
+        if apprenant is not None:
+            apprenants = listes.setdefault(apprenant, _apprenants(apprenant))
+            regles = [
+                (champ, apprenants if champ == "apprenants" else verification)
+                for champ, verification in regles
+            ]
+            if "apprenants" not in requis:
+                regles.append(("apprenants", apprenants))
+        compiles[type_doc] = regles
+    return compiles
+
+
+_COMPILES = _compiler()
+
+
+def _requis_absents(data, type_doc):
+    """Champs obligatoires absents du JSON pour ce document (erreurs de validation)."""
+    requis = [champ for champ in SCHEMAS[type_doc][0] if champ not in data]
+    # L'émargement a besoin des sessions ou des horaires fixes
+    if type_doc == "emargement" and "sessions" not in data and "horaires" not in data:
+        requis.append("sessions ou horaires")
+    return requis
+
+
+def manquants(data, type_doc):
+    """Champs absents du JSON qui rendent ce document non applicable (génération en lot)."""
+    requis = _requis_absents(data, type_doc)
+    # Le programme se génère sans modules (« Programme détaillé à définir. »),
+    # mais n'est produit en lot que pour un JSON qui les décrit
+    if type_doc == "programme" and "modules" not in data:
+        requis.append("modules")
+    return requis
+
+
+def analyser(data, types=None):
+    """
+    Vérifie le JSON pour plusieurs documents en une seule passe.
+
+    Args:
+        data: JSON de la formation (dictionnaire)
+        types: Documents à vérifier (défaut: tous)
+
+    Returns:
+        Dictionnaire {type: liste d'erreurs} (liste vide = document générable)
+    """
+    if not isinstance(data, dict):
+        return {type_doc: ["le JSON doit être un objet"] for type_doc in (types or SCHEMAS)}
+
+    # Chaque (champ, vérification) n'est évalué qu'une fois pour tous les documents
+    deja_verifies = {}
+    rapport = {}
+    for type_doc in types or SCHEMAS:
+        erreurs = [f"{champ} manquant" for champ in _requis_absents(data, type_doc)]
+        for champ, verification in _COMPILES[type_doc]:
+            if champ not in data or verification is None:
+                continue
+            cle = (champ, verification)
+            if cle not in deja_verifies:
+                deja_verifies[cle] = verification(data[champ], champ)
+            erreurs.extend(deja_verifies[cle])
+        if not erreurs and "date_debut" in data and "date_fin" in data:
+            # Dates non vérifiées pour ce document (ex: programme) : comparées seulement si lisibles
+            debut, fin = _lire_date(data["date_debut"]), _lire_date(data["date_fin"])
+            if debut is not None and fin is not None and fin < debut:
+                erreurs.append("date_fin est antérieure à date_debut")
+        rapport[type_doc] = erreurs
+    return rapport
+
+
+def verifier_apprenant(type_doc, apprenant, chemin="apprenant"):
+    """Erreurs d'un apprenant lu hors du JSON (ex: ligne d'un CSV), selon la règle du document."""
+    verification = SCHEMAS[type_doc][2]
+    return verification(apprenant, chemin) if verification is not None else []
+
+
+def valider(data, type_doc):
+    """
+    Vérifie le JSON pour un document, avant tout rendu.
+
+    Raises:
+        SchemaInvalide: avec la liste de toutes les erreurs trouvées
+    """
+    if type_doc not in SCHEMAS:
+        raise ValueError(f"Type de document inconnu : {type_doc}")
+    erreurs = analyser(data, [type_doc])[type_doc]
+    if erreurs:
+        raise SchemaInvalide(type_doc, erreurs)
+
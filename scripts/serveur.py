@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Service local de génération des documents MINDNESS.
+Le processus reste ouvert : python-docx, les générateurs et les templates
+parsés restent en mémoire, chaque requête ne paie que la génération.
+
+API HTTP (sur localhost ou sur un socket Unix) :
+    GET  /sante                   -> {"ok": true, "documents": [...]}
+    POST /generer/<type>          corps = JSON de la formation
+         ?dossier=CHEMIN          dossier de sortie existant (400 sinon)
+         ?format=docx             renvoie le DOCX (ou un zip s'il y en a plusieurs)
+         ?force=1                 régénère même si les entrées n'ont pas changé
+    -> {"fichiers": [...]} ou le contenu du document
+    Sans dossier ni format=docx, les documents sont écrits dans le _source_dir
+    du JSON, ou à défaut dans le dossier courant du serveur.
+
+Usage:
+    python3 serveur.py [--port 8765]
+    python3 serveur.py --socket /tmp/mindness.sock
+    python3 serveur.py --profile-jsonl mesures.jsonl   (mesures de chaque génération)
+"""
+
+import argparse
+import io
+import json
+import os
+import socketserver
+import tempfile
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, quote, urlparse
+from generer_tout import DOCUMENTS, generer_document
+from ecriture_docx import modele_zip
+from cache_fragments import purger_cache
+from commun import options_profil
+from mesures import profiler, sorties
+from parallele import EchecsApprenants
+
+
+TYPE_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def prechauffer():
+    """Parse une fois tous les templates (document et membres bruts du zip)."""
+    dossier_templates = Path(__file__).parent.parent / "templates"
+    for template in sorted(dossier_templates.glob("*.docx")):
+        modele_zip(str(template))
+    print(f"🔥 Templates chargés depuis {dossier_templates}")
+
+
+class GestionnaireRequetes(BaseHTTPRequestHandler):
+    """Traite les requêtes /sante et /generer/<type>."""
+
+    # Sorties des mesures de chaque génération (--profile), aucune par défaut
+    sorties_profil = []
+
+    # Dernière purge du cache des fragments (au plus une par jour)
+    derniere_purge = 0.0
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/sante":
+            self._repondre_json(404, {"erreur": "Route inconnue"})
+            return
+        self._repondre_json(200, {"ok": True, "documents": list(DOCUMENTS)})
+
+    def do_POST(self):
+        self._purger_cache()
+        url = urlparse(self.path)
+        morceaux = url.path.strip("/").split("/")
+        if len(morceaux) != 2 or morceaux[0] != "generer":
+            self._repondre_json(404, {"erreur": "Route inconnue"})
+            return
+        parametres = {cle: valeurs[-1] for cle, valeurs in parse_qs(url.query).items()}
+        force = parametres.get("force") in ("1", "true", "oui")
+
+        try:
+            longueur = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(longueur).decode("utf-8"))
+        except (ValueError, UnicodeDecodeError) as e:
+            self._repondre_json(400, {"erreur": f"JSON invalide : {e}"})
+            return
+        if parametres.get("dossier") and not os.path.isdir(parametres["dossier"]):
+            # Sinon chaque apprenant échouerait sur le même dossier absent
+            self._repondre_json(400, {"erreur": f"Dossier de sortie introuvable : {parametres['dossier']}"})
+            return
+
+        try:
+            with profiler(self.sorties_profil, morceaux[1]):
+                if parametres.get("format") == "docx":
+                    # Génération dans un dossier temporaire, le contenu est renvoyé directement
+                    with tempfile.TemporaryDirectory(prefix="mindness_") as dossier:
+                        fichiers = generer_document(morceaux[1], data, parametres.get("dossier") or dossier, force)
+                        # Réponse entièrement préparée avant la ligne de statut
+                        reponse = self._contenu_fichiers(fichiers)
+                    self._repondre(200, *reponse)
+                    return
+                fichiers = generer_document(morceaux[1], data, parametres.get("dossier"), force)
+        except EchecsApprenants as e:
+            # Documents réussis et échecs par apprenant (aucun document renvoyé)
+            temporaire = parametres.get("format") == "docx" and not parametres.get("dossier")
+            self._repondre_json(500, {
+                "erreur": str(e),
+                # Dossier temporaire déjà supprimé : seulement les noms des documents réussis
+                "fichiers": [os.path.basename(fichier) if temporaire else os.path.abspath(fichier)
+                             for fichier in e.fichiers],
+                "echecs": [{"apprenant": apprenant, "erreur": message} for apprenant, message in e.echecs],
+            })
+            return
+        except ValueError as e:
+            self._repondre_json(400, {"erreur": str(e)})
+            return
+        except Exception as e:
+            self._repondre_json(500, {"erreur": str(e)})
+            return
+        self._repondre_json(200, {"fichiers": [os.path.abspath(fichier) for fichier in fichiers]})
+
+    @classmethod
+    def _purger_cache(cls):
+        """Le service reste ouvert : les fragments inutilisés sont supprimés une fois par jour."""
+        if time.time() - cls.derniere_purge >= 86400:
+            cls.derniere_purge = time.time()
+            supprimes = purger_cache()
+            if supprimes:
+                print(f"🧹 {supprimes} fragment(s) inutilisé(s) supprimé(s) du cache")
+
+    def _contenu_fichiers(self, fichiers):
+        """Contenu à renvoyer : un DOCX, ou un zip des DOCX s'il y en a plusieurs (contenu, type, nom)."""
+        if len(fichiers) == 1:
+            with open(fichiers[0], "rb") as f:
+                return f.read(), TYPE_DOCX, os.path.basename(fichiers[0])
+        tampon = io.BytesIO()
+        with zipfile.ZipFile(tampon, "w", zipfile.ZIP_STORED) as archive:
+            for fichier in fichiers:
+                archive.write(fichier, os.path.basename(fichier))
+        return tampon.getvalue(), "application/zip", "documents.zip"
+
+    def _repondre_json(self, code, contenu):
+        self._repondre(code, json.dumps(contenu, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def _repondre(self, code, contenu, type_contenu, nom_fichier=None):
+        self.send_response(code)
+        self.send_header("Content-Type", type_contenu)
+        self.send_header("Content-Length", str(len(contenu)))
+        if nom_fichier:
+            # En-têtes HTTP en latin-1 : nom encodé selon la RFC 5987 ("Cœur" -> C%C5%93ur)
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(nom_fichier)}")
+        self.end_headers()
+        self.wfile.write(contenu)
+
+    def address_string(self):
+        # Sur un socket Unix, le client n'a pas d'adresse
+        return self.client_address[0] if self.client_address else "unix"
+
+
+class ServeurUnix(socketserver.UnixStreamServer):
+    """Serveur HTTP sur un socket Unix (mêmes routes qu'en TCP)."""
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service local de génération des documents.")
+    parser.add_argument("--port", type=int, default=8765, help="Port HTTP sur 127.0.0.1 (défaut: 8765)")
+    parser.add_argument("--socket", help="Écouter sur ce socket Unix plutôt qu'en TCP")
+    options_profil(parser)
+    args = parser.parse_args()
+
+    GestionnaireRequetes.sorties_profil = sorties(args.profile, args.profile_jsonl)
+    prechauffer()
+    if args.socket:
+        serveur = ServeurUnix(args.socket, GestionnaireRequetes)
+        print(f"🚀 Service de génération sur {args.socket}")
+    else:
+        serveur = HTTPServer(("127.0.0.1", args.port), GestionnaireRequetes)
+        print(f"🚀 Service de génération sur http://127.0.0.1:{args.port}")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Arrêt du service")
+    finally:
+        serveur.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
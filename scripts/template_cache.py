@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache des templates Word pour les générateurs MINDNESS.
+Chaque template est parsé une seule fois par processus (clé : chemin + mtime),
+puis chaque document généré part d'une copie en mémoire du template parsé.
+"""
+
+import copy
+import os
+from commun import Document
+from mesures import phase
+
+
+# Templates déjà parsés : chemin absolu -> (mtime, Document)
+_templates = {}
+
+
+def charger_template_parse(template_path):
+    """Retourne le Document parsé du template (partagé, ne pas modifier)."""
+    chemin = os.path.abspath(template_path)
+    mtime = os.path.getmtime(chemin)
+
+    entree = _templates.get(chemin)
+    if entree is None or entree[0] != mtime:
+        entree = (mtime, Document(chemin))
+        _templates[chemin] = entree
+    return entree[1]
+
+
+def charger_template(template_path):
+    """Retourne une copie modifiable du template, sans relire le fichier."""
+    with phase("template"):
+        return copy.deepcopy(charger_template_parse(template_path))
+
+
+def vider_cache():
+    """Oublie tous les templates parsés."""
+    _templates.clear()